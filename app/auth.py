@@ -1,8 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials, OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from collections import OrderedDict
+import os
 import secrets
+import threading
 import jwt
 import time
+from app.tracing import span
 
 router = APIRouter()
 security = HTTPBasic()
@@ -10,6 +14,7 @@ security = HTTPBasic()
 # JWT Configuration
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
+SIGNING_KEY_GENERATION = 0  # bumped by rotate_signing_key
 
 # Dummy user database (for demo only)
 USERS = {
@@ -49,19 +54,111 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
         return {"access_token": token, "token_type": "bearer"}
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens that already passed signature verification,
+    mapped to their subject. An entry lives until the token's own `exp`;
+    keys include the signing-key generation so a rotation orphans them.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, username = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return username
+
+    def put(self, key, expires_at: int, username: str):
+        with self._lock:
+            self._data[key] = (expires_at, username)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+_token_cache_size = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+token_cache = VerifiedTokenCache(_token_cache_size) if _token_cache_size > 0 else None
+
+
+def rotate_signing_key(new_key: str):
+    """Switch to a new signing key; tokens signed with the old one stop verifying right away."""
+    global SECRET_KEY, SIGNING_KEY_GENERATION
+    SECRET_KEY = new_key
+    SIGNING_KEY_GENERATION += 1
+    if token_cache is not None:
+        token_cache.clear()
+
+
 # Token verification function
 def get_current_user(token: str = Depends(oauth2_scheme)):
+    with span("auth"):
+        return verify_token(token)
+
+def verify_token(token: str) -> str:
+    # ♻️ Tokens seen before skip the decode + HMAC check until they expire
+    key = (SIGNING_KEY_GENERATION, token)
+    if token_cache is not None:
+        username = token_cache.get(key)
+        if username is not None:
+            return username
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
+        # tokens without exp are verified every time rather than cached forever;
+        # PyJWT truncates exp before comparing (int(exp) <= now), so the cache does too
+        if token_cache is not None and isinstance(payload.get("exp"), (int, float)):
+            token_cache.put(key, int(payload["exp"]), username)
         return username
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+@router.get("/auth/stats")
+def auth_stats(user: str = Depends(get_current_user)):
+    # 📊 Verified-token cache counters
+    return {"token_cache": token_cache.stats() if token_cache is not None else None}
+
 # JWT-protected route
 @router.get("/protected")
 def protected_route(user: str = Depends(get_current_user)):
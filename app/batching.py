@@ -0,0 +1,153 @@
+# app/batching.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from app.inference import score
+from app.metrics import INFERENCE_SECONDS, INFERENCE_ROWS
+
+# batch-size histogram buckets (upper bounds, inclusive)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """
+    Merges concurrent single-row predictions into one model call.
+
+    A background thread takes the first queued row and keeps collecting until
+    `max_batch_size` rows are queued or the current window expires. The window
+    adapts to load: it collapses to zero while requests arrive one at a time
+    (no added latency) and widens towards `max_wait` while callers overlap.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait: float = 0.002):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._window = 0.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        self._histogram = [0] * (len(BATCH_BUCKETS) + 1)
+
+    # ---------- public API -----------------------------------------
+    def submit(self, model, features: np.ndarray) -> Future:
+        """Queue a (1, n_features) row for `model`; the future resolves to (class, probability)."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((model, features, future))
+        return future
+
+    def predict(self, model, features: np.ndarray, timeout: float = None):
+        return self.submit(model, features).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        histogram = {f"le_{b}": n for b, n in zip(BATCH_BUCKETS, self._histogram)}
+        histogram["gt_256"] = self._histogram[-1]
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self._batches,
+            "rows": self._rows,
+            "avg_batch_size": self._rows / self._batches if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "window_ms": self._window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size_histogram": histogram,
+        }
+
+    def close(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    # ---------- worker ---------------------------------------------
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self._window
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            self._adapt(len(batch))
+            if stop:
+                return
+
+    def _flush(self, batch):
+        # requests that grabbed different model snapshots (during a hot swap) are scored separately
+        groups = {}
+        for model, features, future in batch:
+            groups.setdefault(id(model), (model, []))[1].append((features, future))
+
+        for model, items in groups.values():
+            try:
+                with INFERENCE_SECONDS.time("microbatch"):
+                    classes, proba = score(model, np.concatenate([f for f, _ in items]))
+                INFERENCE_ROWS.observe(len(items), "microbatch")
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), c, p in zip(items, classes.tolist(), proba.tolist()):
+                future.set_result((int(c), p))
+
+        size = len(batch)
+        self._batches += 1
+        self._rows += size
+        self._largest_batch = max(self._largest_batch, size)
+        for i, bound in enumerate(BATCH_BUCKETS):
+            if size <= bound:
+                self._histogram[i] += 1
+                break
+        else:
+            self._histogram[-1] += 1
+
+    def _adapt(self, size: int):
+        if size > 1:
+            # concurrent callers are queueing up: wait longer so the next batch amortizes more work
+            self._window = min(self.max_wait, max(self._window * 2, self.max_wait / 8))
+        else:
+            # nobody else was waiting: stop adding latency
+            self._window = self._window / 2 if self._window > self.max_wait / 64 else 0.0
+
+
+def create_batcher():
+    if os.getenv("PREDICT_MICROBATCH", "1") != "1":
+        return None
+    return MicroBatcher(
+        max_batch_size=int(os.getenv("PREDICT_BATCH_MAX_ROWS", "64")),
+        max_wait=float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2")) / 1000,
+    )
+
+
+batcher = create_batcher()
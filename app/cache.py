@@ -0,0 +1,88 @@
+# app/cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.schemas import HEART_FEATURES
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a per-entry TTL, keyed on (model version,
+    canonical feature tuple). Safe to share between threadpool workers.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(model_version: str, input_data) -> tuple:
+        # ints stay ints; oldpeak is normalised so 1, 1.0 and 1.0000000001 share an entry
+        return (model_version,) + tuple(
+            round(float(v), 6) if isinstance(v, float) else int(v)
+            for v in (getattr(input_data, name) for name in HEART_FEATURES)
+        )
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+def create_cache():
+    maxsize = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+    if maxsize <= 0:
+        return None
+    return PredictionCache(maxsize=maxsize, ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")))
+
+
+prediction_cache = create_cache()
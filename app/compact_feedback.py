@@ -0,0 +1,66 @@
+# app/compact_feedback.py
+#
+# One-off maintenance for feedback tables written before content hashing:
+# fills content_hash on old rows and deletes the repeats (keeping the lowest
+# id), so the unique index covers the whole table.
+#
+#   python -m app.compact_feedback [--vacuum]
+
+import argparse
+
+from sqlalchemy import text
+
+from app.database import engine as default_engine
+from app.feedback_store import FEEDBACK_COLUMNS, content_hash, ensure_content_hash
+
+BATCH_SIZE = 10_000
+
+
+def compact_feedback(engine=None, batch_size: int = BATCH_SIZE) -> dict:
+    """Backfill missing hashes and drop duplicate rows in one transaction; returns counts."""
+    engine = engine or default_engine
+    ensure_content_hash(engine)
+
+    update = text("UPDATE feedback SET content_hash = :h WHERE id = :row_id")
+    delete = text("DELETE FROM feedback WHERE id = :row_id")
+
+    with engine.begin() as conn:
+        seen = set(conn.execute(text("SELECT content_hash FROM feedback WHERE content_hash IS NOT NULL")).scalars())
+        result = conn.execution_options(stream_results=True).execute(text(
+            f"SELECT id, {', '.join(FEEDBACK_COLUMNS)} FROM feedback WHERE content_hash IS NULL ORDER BY id"
+        ))
+        # collect first: SQLite can't update the table while this cursor is still open on it
+        updates, deletes = [], []
+        for rows in result.partitions(batch_size):
+            for row in rows:
+                h = content_hash(row._mapping)
+                if h in seen:
+                    deletes.append({"row_id": row.id})
+                else:
+                    seen.add(h)
+                    updates.append({"h": h, "row_id": row.id})
+
+        for start in range(0, len(deletes), batch_size):
+            conn.execute(delete, deletes[start:start + batch_size])
+        for start in range(0, len(updates), batch_size):
+            conn.execute(update, updates[start:start + batch_size])
+
+    return {"hashed": len(updates), "removed": len(deletes), "distinct": len(seen)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill feedback content hashes and remove duplicate rows.")
+    parser.add_argument("--vacuum", action="store_true", help="reclaim the freed pages afterwards (SQLite)")
+    args = parser.parse_args()
+
+    counts = compact_feedback()
+    print(f"✅ Hashed {counts['hashed']} rows, removed {counts['removed']} duplicates "
+          f"({counts['distinct']} distinct rows)")
+    if args.vacuum and default_engine.dialect.name == "sqlite":
+        with default_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+        print("🧹 VACUUM done")
+
+
+if __name__ == "__main__":
+    main()
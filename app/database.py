@@ -1,15 +1,71 @@
 # app/database.py
 
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# ✅ Create SQLite engine
-SQLALCHEMY_DATABASE_URL = "sqlite:///./feedback.db"
+# ✅ Database location (any SQLAlchemy URL; SQLite file by default)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./feedback.db")
+# training / exports read from here; point it at a replica on a server database
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL", SQLALCHEMY_DATABASE_URL)
+
+# ✅ Per-connection SQLite settings: WAL lets readers and the writer run side by side
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),  # NORMAL is crash-safe under WAL
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000")),  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def _set_sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            # the journal mode is stored in the file; only the writer side sets it
+            if read_only and name == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+    return on_connect
+
+
+def create_storage_engine(url: str = SQLALCHEMY_DATABASE_URL, read_only: bool = False):
+    """
+    Engine with one configured connection pool. SQLite connections get the
+    WAL/cache/mmap/busy-timeout pragmas; `read_only` ones are also switched
+    to query_only so a stray write fails instead of taking the write lock.
+    """
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    in_memory = is_sqlite and parsed.database in (None, "", ":memory:")
+
+    kwargs = {}
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not in_memory:
+        kwargs.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                      pool_timeout=POOL_TIMEOUT, pool_pre_ping=not is_sqlite)
+
+    new_engine = create_engine(url, **kwargs)
+    if is_sqlite:
+        event.listen(new_engine, "connect", _set_sqlite_pragmas(read_only))
+    return new_engine
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# ✅ Create engines (connections are opened lazily)
+engine = create_storage_engine(SQLALCHEMY_DATABASE_URL)
+read_engine = create_storage_engine(SQLALCHEMY_READ_DATABASE_URL, read_only=True)
 
 # ✅ Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,85 @@
+# app/feedback_store.py
+#
+# Core-level writes to the feedback table. Rows go through a single
+# executemany in one transaction instead of one ORM object, commit and
+# refresh per row. Each row carries a hash of its features and label under a
+# unique index, so repeated submissions are dropped at insert time.
+
+import hashlib
+import importlib
+from typing import Iterable, List, Optional
+
+from sqlalchemy import inspect, insert, text
+
+from app.database import engine as default_engine
+from app.models import Feedback, CONTENT_HASH_INDEX
+from app.metrics import FEEDBACK_INSERT_SECONDS, FEEDBACK_ROWS
+
+# the 13 features plus the label; also the columns a client supplies
+FEEDBACK_COLUMNS = [c.name for c in Feedback.__table__.columns if c.name not in ("id", "content_hash")]
+
+# dialects whose INSERT can skip rows that hit the unique index; imported on
+# first use (the postgresql dialect alone adds ~100 ms to app start-up)
+_UPSERT_DIALECTS = ("sqlite", "postgresql")
+
+
+def feedback_row(input_data) -> dict:
+    """Plain column dict for one validated FeedbackInput."""
+    return {name: getattr(input_data, name) for name in FEEDBACK_COLUMNS}
+
+
+def content_hash(row) -> str:
+    # every value goes through float so 60, 60.0 and a REAL read back from SQLite hash the same
+    canonical = ",".join("" if row[name] is None else repr(float(row[name])) for name in FEEDBACK_COLUMNS)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def insert_feedback(rows: Iterable[dict], engine=None, path: str = "direct") -> List[Optional[int]]:
+    """
+    Insert feedback rows in one transaction and return their ids, in the
+    same order as `rows`. Rows already stored (or repeated earlier in
+    `rows`) are skipped and get None. `path` labels the insert metrics.
+    """
+    engine = engine or default_engine
+    rows = [dict(row, content_hash=content_hash(row)) for row in rows]
+    fresh, seen = [], set()
+    for row in rows:
+        if row["content_hash"] not in seen:
+            seen.add(row["content_hash"])
+            fresh.append(row)
+    if not fresh:
+        return []
+
+    if engine.dialect.name in _UPSERT_DIALECTS:
+        dialect = importlib.import_module(f"sqlalchemy.dialects.{engine.dialect.name}")
+        stmt = dialect.insert(Feedback).on_conflict_do_nothing(index_elements=["content_hash"])
+    else:
+        stmt = insert(Feedback)
+    # skipped rows return nothing, so ids are matched back to rows by hash
+    stmt = stmt.returning(Feedback.content_hash, Feedback.id)
+    with FEEDBACK_INSERT_SECONDS.time(path), engine.begin() as conn:
+        ids = dict(conn.execute(stmt, fresh).all())
+    FEEDBACK_ROWS.inc("stored", amount=len(ids))
+    FEEDBACK_ROWS.inc("duplicate", amount=len(rows) - len(ids))
+
+    # pop so a hash repeated within `rows` only credits its first occurrence
+    return [ids.pop(row["content_hash"], None) for row in rows]
+
+
+def ensure_content_hash(engine=None):
+    """Add the content_hash column and its unique index to a feedback table created before they existed."""
+    engine = engine or default_engine
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if not inspector.has_table(Feedback.__tablename__):
+            return
+        changed = False
+        if "content_hash" not in {c["name"] for c in inspector.get_columns(Feedback.__tablename__)}:
+            conn.execute(text("ALTER TABLE feedback ADD COLUMN content_hash VARCHAR(64)"))
+            changed = True
+        if CONTENT_HASH_INDEX not in {i["name"] for i in inspector.get_indexes(Feedback.__tablename__)}:
+            conn.execute(text(f"CREATE UNIQUE INDEX {CONTENT_HASH_INDEX} ON feedback (content_hash)"))
+            changed = True
+    if changed:
+        # pooled SQLite connections can keep the old schema and reject ON CONFLICT (content_hash)
+        engine.dispose()
@@ -0,0 +1,272 @@
+# app/feedback_writer.py
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+from app.feedback_store import insert_feedback
+
+
+class FeedbackQueueFullError(RuntimeError):
+    pass
+
+
+class FeedbackWriter:
+    """
+    Write-behind buffer for single-row feedback.
+
+    `submit` acknowledges a row once it is queued in memory and, when a
+    `log_path` is set, appended and fsynced to a local JSONL log. Each process
+    appends to its own `<log_path>.<pid>`, so API workers sharing a directory
+    never touch each other's files; concurrent submits share fsyncs. A background
+    thread moves queued rows into the feedback table in one transaction every
+    `flush_interval` seconds, or sooner once `flush_size` rows are waiting.
+
+    Before each flush the live log is rotated into a numbered segment; a
+    segment is deleted only after the rows it holds are committed. Segments
+    left behind by a crashed process (any pid no longer running) are claimed
+    and replayed into the queue by the next process to start, so
+    delivery is at-least-once: a crash between commit and segment removal
+    replays rows that were already stored, and the content-hash index then
+    drops them as duplicates.
+    """
+
+    def __init__(self, flush_interval: float = 0.5, flush_size: int = 500,
+                 max_queue: int = 100_000, log_path: Optional[str] = None, engine=None):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_queue = max_queue
+        self.log_path = log_path
+        self.engine = engine
+        self._rows: List[dict] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closing = False
+        self._log = None
+        self._live_path = f"{log_path}.{os.getpid()}" if log_path else None
+        self._segments: List[str] = []
+        self._next_segment = 0
+        self._sync_lock = threading.Lock()
+        self._written = 0  # lines appended to the log so far
+        self._synced = 0   # lines known to be on disk
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.replayed = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+        self.last_error = None
+
+        if log_path:
+            self._recover()
+            self._log = open(self._live_path, "a", encoding="utf-8")
+        self._worker = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._worker.start()
+
+    # ---------- public API -----------------------------------------
+    def submit(self, row: dict):
+        line = json.dumps(row, separators=(",", ":")) + "\n"
+        seq = None
+        with self._cond:
+            if self._closing:
+                raise FeedbackQueueFullError("feedback writer is shutting down")
+            if len(self._rows) >= self.max_queue:
+                raise FeedbackQueueFullError(f"{len(self._rows)} feedback rows already waiting")
+            if self._log is not None:
+                self._log.write(line)
+                self._log.flush()
+                self._written += 1
+                seq = self._written
+            self._rows.append(row)
+            self.enqueued += 1
+            if len(self._rows) >= self.flush_size:
+                self._cond.notify()
+        if seq is not None:
+            self._sync_log(seq)
+
+    def flush(self):
+        """Write everything queued so far; returns once it is committed (or the attempt failed)."""
+        self._flush_once()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._rows),
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "duplicates": self.duplicates,
+            "replayed": self.replayed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_seconds * 1000,
+            "max_flush_ms": self.max_flush_seconds * 1000,
+            "avg_flush_ms": self._total_flush_seconds / self.flushes * 1000 if self.flushes else 0.0,
+            "pending_log_segments": len(self._segments),
+            "flush_interval_ms": self.flush_interval * 1000,
+            "flush_size": self.flush_size,
+            "durable_log": self.log_path,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        """Stop accepting rows and drain the queue into the database."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._worker.join()
+        if self._log is not None:
+            with self._sync_lock:
+                self._log.close()
+                self._log = None
+            # a clean shutdown leaves nothing behind for this pid
+            if os.path.getsize(self._live_path) == 0:
+                os.remove(self._live_path)
+
+    # ---------- worker ---------------------------------------------
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closing and len(self._rows) < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                closing = self._closing
+            self._flush_once()
+            if closing:
+                # a failed final flush leaves its rows in the log segments for the next start
+                return
+
+    def _flush_once(self):
+        # one flush at a time, so a segment is only ever deleted by the flush that committed it
+        with self._flush_lock:
+            self._flush_batch()
+
+    def _flush_batch(self):
+        with self._cond:
+            if not self._rows:
+                return
+            batch, self._rows = self._rows, []
+            self._rotate_log()
+            segments = list(self._segments)
+
+        started = time.perf_counter()
+        try:
+            ids = insert_feedback(batch, engine=self.engine, path="write_behind")
+        except Exception as e:
+            with self._cond:
+                # put the rows back in front of anything queued meanwhile and retry next tick
+                self._rows = batch + self._rows
+                self.failed_flushes += 1
+                self.last_error = str(e)
+            print(f"⚠️ Feedback flush of {len(batch)} rows failed: {e}")
+            return
+        elapsed = time.perf_counter() - started
+
+        with self._cond:
+            for path in segments:
+                os.remove(path)
+                self._segments.remove(path)
+            duplicates = sum(1 for feedback_id in ids if feedback_id is None)
+            self.flushed += len(batch) - duplicates
+            self.duplicates += duplicates
+            self.flushes += 1
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self._total_flush_seconds += elapsed
+            self.last_error = None
+
+    # ---------- durable log ----------------------------------------
+    def _sync_log(self, seq: int):
+        # group commit, outside the queue lock: one fsync covers every line written before it
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            target = self._written
+            os.fsync(self._log.fileno())
+            self._synced = target
+
+    def _rotate_log(self):
+        # called with the queue lock held; every row in the batch is in a segment after this
+        if self._log is None:
+            return
+        with self._sync_lock:
+            # lines still waiting on a producer's fsync are covered here, before the handle goes
+            os.fsync(self._log.fileno())
+            self._synced = self._written
+            self._log.close()
+            segment = f"{self._live_path}.{self._next_segment}"
+            self._next_segment += 1
+            os.replace(self._live_path, segment)
+            self._segments.append(segment)
+            self._log = open(self._live_path, "a", encoding="utf-8")
+
+    def _recover(self):
+        # <log>.<pid> is a live log, <log>.<pid>.<n> a segment; the bare <log> is the pre-pid layout
+        pid = os.getpid()
+        own, orphans = [], []
+        for path in glob.glob(f"{glob.escape(self.log_path)}*"):
+            parts = path[len(self.log_path):].split(".")[1:]
+            if not all(p.isdigit() for p in parts) or len(parts) > 2:
+                continue
+            owner = int(parts[0]) if parts else None
+            number = int(parts[1]) if len(parts) == 2 else float("inf")
+            if owner == pid and len(parts) == 2:
+                own.append((number, path))
+            elif owner is None or owner == pid or not _pid_alive(owner):
+                orphans.append((owner or 0, number, path))
+
+        # a previous process with our pid left these; keep their names and number after them
+        segments = [path for _, path in sorted(own)]
+        self._next_segment = max((n for n, _ in own), default=-1) + 1
+        for _, _, path in sorted(orphans):
+            try:
+                if os.path.getsize(path) == 0:
+                    os.remove(path)
+                    continue
+                segment = f"{self._live_path}.{self._next_segment}"
+                os.replace(path, segment)
+            except FileNotFoundError:
+                continue  # another starting process claimed it first
+            self._next_segment += 1
+            segments.append(segment)
+
+        for path in segments:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    # a torn final line from a crash mid-append was never acknowledged
+                    try:
+                        self._rows.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+                    self.replayed += 1
+        self._segments = segments
+        if self.replayed:
+            print(f"♻️ Replaying {self.replayed} unflushed feedback rows from {self.log_path}")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+def create_writer():
+    if os.getenv("FEEDBACK_WRITE_BEHIND", "0") != "1":
+        return None
+    return FeedbackWriter(
+        flush_interval=float(os.getenv("FEEDBACK_FLUSH_INTERVAL_MS", "500")) / 1000,
+        flush_size=int(os.getenv("FEEDBACK_FLUSH_SIZE", "500")),
+        max_queue=int(os.getenv("FEEDBACK_MAX_QUEUED", "100000")),
+        log_path=os.getenv("FEEDBACK_WRITE_LOG", "feedback-writebehind.log") or None,
+    )
+
+
+feedback_writer = create_writer()
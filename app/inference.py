@@ -0,0 +1,508 @@
+# app/inference.py
+#
+# Array-only ("compiled") forms of the models ml/train_model.py produces, and
+# a pure-NumPy evaluator for them. Serving one row through sklearn's Pipeline
+# spends most of its time in input validation; these evaluate the same math
+# directly on the feature matrix.
+
+import json
+import os
+import time
+
+import numpy as np
+
+
+class UnsupportedModelError(ValueError):
+    pass
+
+
+def score(model, features: np.ndarray):
+    """
+    Run one vectorized predict_proba call.
+
+    Returns:
+        (classes, positive-class probabilities), both shaped (n,)
+    """
+    proba = model.predict_proba(features)
+    # argmax over the proba columns is exactly what predict() does for RF / LR / XGB
+    classes = np.asarray(getattr(model, "classes_", [0, 1]))[proba.argmax(axis=1)]
+    return classes, proba[:, 1]
+
+
+_explained = (None, None)  # (estimator, its compiled form) for the last pickle explained
+
+
+def explain(model, features: np.ndarray):
+    """
+    Per-feature contributions for every row in one vectorized call, using
+    the model's own fast path: path-based attribution for compiled trees,
+    coefficient * standardized input for the linear model, pred_contribs
+    for an XGBoost booster.
+
+    Returns:
+        (contributions shaped (n, n_features), base values shaped (n,), units,
+        method) - method is "exact" (SHAP values) or "approximate" (per-path
+        attribution, the booster's approx_contribs)
+    """
+    global _explained
+    features = np.asarray(features, dtype=np.float64)
+    # process-pool stand-ins explain in-process from the resident copy
+    model = getattr(model, "resident", model)
+
+    if hasattr(model, "get_booster"):
+        import xgboost
+
+        out = model.get_booster().predict(xgboost.DMatrix(features), pred_contribs=True, validate_features=False)
+        return out[:, :-1], out[:, -1], "log-odds", "exact"
+
+    if not isinstance(model, CompiledModel):
+        # sklearn pickle: compile it once and explain from the arrays
+        if _explained[0] is not model:
+            _explained = (model, compile_model(model))
+        model = _explained[1]
+    contributions, base = model.contributions(features)
+    return contributions, np.full(len(features), base), model.contribution_units, model.contribution_method
+
+
+# a typical patient in HEART_FEATURES order, for warm-up calls
+WARMUP_ROW = (54, 0, 2, 130, 240, 0, 1, 150, 0, 1.0, 1, 0, 1)
+
+
+def warm_up(model, rows: int = 64) -> float:
+    """
+    Score one row and one `rows`-row batch so lazy imports, allocator pools
+    and per-shape code paths are paid before the first request. Returns the
+    seconds spent.
+    """
+    started = time.perf_counter()
+    # scale the row by 0.8x-1.2x so tree models walk more than one path
+    batch = np.outer(np.linspace(0.8, 1.2, rows), np.asarray(WARMUP_ROW, dtype=np.float64))
+    score(model, batch[:1])
+    score(model, batch)
+    return time.perf_counter() - started
+
+
+# ------------------------------------------------------------------ #
+# 1. COMPILED MODEL TYPES
+# ------------------------------------------------------------------ #
+class CompiledModel:
+    kind = None
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.arrays = arrays
+        self.meta = meta
+        self.classes_ = np.asarray(meta.get("classes", [0, 1]))
+
+    def predict(self, X) -> np.ndarray:
+        proba = self.predict_proba(X)
+        return self.classes_[proba.argmax(axis=1)]
+
+    def predict_proba(self, X) -> np.ndarray:
+        raise NotImplementedError
+
+    # units of contributions(): what they (plus the base value) add up to
+    contribution_units = None
+    # "exact" when they are the SHAP values, "approximate" for per-path attribution
+    contribution_method = "approximate"
+
+    def contributions(self, X):
+        """
+        Per-feature contributions to the positive-class score of every row.
+
+        Returns:
+            (contributions shaped (n, n_features), base value shared by all rows);
+            each row's contributions plus the base value give its score in
+            `contribution_units`
+        """
+        raise UnsupportedModelError(f"no contributions for {self.kind} models")
+
+
+class CompiledLinear(CompiledModel):
+    """StandardScaler + LogisticRegression folded into one weight vector and bias."""
+    kind = "linear"
+
+    def __init__(self, arrays, meta):
+        super().__init__(arrays, meta)
+        self.coef = arrays["coef"]
+        self.intercept = float(arrays["intercept"][0])
+        # artifacts from before contributions existed lack it; they explain relative to x = 0
+        self.scale_mean = arrays.get("scale_mean")
+
+    def predict_proba(self, X) -> np.ndarray:
+        z = np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+        p = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack([1.0 - p, p])
+
+    contribution_units = "log-odds"
+    contribution_method = "exact"  # for a linear model, coef * (x - mean) is its SHAP value
+
+    def contributions(self, X):
+        # folded coef * (x - mean) == original coefficient * standardized x
+        X = np.asarray(X, dtype=np.float64)
+        if self.scale_mean is None:
+            return X * self.coef, self.intercept
+        return (X - self.scale_mean) * self.coef, self.intercept + float(self.coef @ self.scale_mean)
+
+
+class CompiledTrees(CompiledModel):
+    """
+    Tree ensemble flattened into global node arrays. Leaves point at
+    themselves, and only (row, tree) pairs that haven't reached a leaf are
+    advanced at each depth.
+    """
+
+    def __init__(self, arrays, meta):
+        super().__init__(arrays, meta)
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.roots = arrays["roots"]
+        self.value = arrays["value"]
+        self.max_depth = int(meta["max_depth"])
+        self.scale_mean = arrays.get("scale_mean")
+        self.scale_std = arrays.get("scale_std")
+        # published with the model, so memory-mapped copies share them; older artifacts derive them here
+        lookups = arrays if "children" in arrays else _tree_lookups(self.left, self.right)
+        self._children = lookups["children"]
+        self._is_leaf = lookups["is_leaf"]
+
+    def _prepare(self, X) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        if self.scale_mean is not None:
+            X -= self.scale_mean
+            X /= self.scale_std
+        # both sklearn trees and XGBoost evaluate splits on float32 features
+        return X.astype(np.float32)
+
+    def apply(self, X) -> np.ndarray:
+        """Global leaf index reached in every tree, shaped (n_rows, n_trees)."""
+        X = self._prepare(X)
+        n_rows, n_features = X.shape
+        n_trees = self.roots.shape[0]
+        flat_x = X.ravel()
+
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        active = np.flatnonzero(~self._is_leaf[node])
+        for _ in range(self.max_depth):
+            if not active.size:
+                break
+            current = node[active]
+            x = flat_x[row_offset[active] + self.feature[current]]
+            nxt = self._children[2 * current + self._goes_right(x, current)]
+            node[active] = nxt
+            active = active[~self._is_leaf[nxt]]
+        return node.reshape(n_rows, n_trees)
+
+    def _path_contributions(self, X, node_value):
+        """
+        Path-based (Saabas) attribution: every split on a row's root-to-leaf
+        path credits its feature with node_value[child] - node_value[parent].
+        Same vectorized walk as apply(); returns the per-feature sums over
+        all trees and the summed root values.
+        """
+        X = self._prepare(X)
+        n_rows, n_features = X.shape
+        n_trees = self.roots.shape[0]
+        flat_x = X.ravel()
+
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        contributions = np.zeros(n_rows * n_features)
+        active = np.flatnonzero(~self._is_leaf[node])
+        for _ in range(self.max_depth):
+            if not active.size:
+                break
+            current = node[active]
+            slot = row_offset[active] + self.feature[current]
+            nxt = self._children[2 * current + self._goes_right(flat_x[slot], current)]
+            contributions += np.bincount(slot, weights=node_value[nxt] - node_value[current],
+                                         minlength=contributions.shape[0])
+            node[active] = nxt
+            active = active[~self._is_leaf[nxt]]
+        return contributions.reshape(n_rows, n_features), float(node_value[self.roots].sum())
+
+    def _goes_right(self, x, node):
+        raise NotImplementedError
+
+
+class CompiledForest(CompiledTrees):
+    """sklearn RandomForestClassifier (optionally behind a StandardScaler)."""
+    kind = "forest"
+
+    def _goes_right(self, x, node):
+        # sklearn compares the float32 feature against a float64 threshold
+        return x > self.threshold[node]
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        n_trees = leaves.shape[1]
+        # sklearn adds tree probabilities one tree at a time; cumsum keeps that order
+        return np.column_stack([
+            np.cumsum(self.value[leaves, k], axis=1)[:, -1] / n_trees
+            for k in range(self.value.shape[1])
+        ])
+
+    contribution_units = "probability"
+
+    def contributions(self, X):
+        # internal nodes carry their class distribution too, so the forest average explains the probability
+        n_trees = self.roots.shape[0]
+        contributions, base = self._path_contributions(X, self.value[:, -1])
+        return contributions / n_trees, base / n_trees
+
+
+class CompiledBoosted(CompiledTrees):
+    """XGBoost gbtree with a binary:logistic objective."""
+    kind = "boosted"
+
+    def __init__(self, arrays, meta):
+        super().__init__(arrays, meta)
+        self.default_left = arrays["default_left"]
+        self.base_margin = float(meta["base_margin"])
+
+    def _goes_right(self, x, node):
+        return np.where(np.isnan(x), ~self.default_left[node], ~(x < self.threshold[node]))
+
+    def margin(self, X) -> np.ndarray:
+        return self.value[self.apply(X)].sum(axis=1) + self.base_margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = 1.0 / (1.0 + np.exp(-self.margin(X)))
+        return np.column_stack([1.0 - p, p])
+
+    contribution_units = "log-odds"
+
+    def contributions(self, X):
+        # same attribution as the booster's pred_contribs(approx_contribs=True)
+        if "node_mean" not in self.arrays:
+            raise UnsupportedModelError("compiled before contributions were supported; republish the model")
+        contributions, base = self._path_contributions(X, self.arrays["node_mean"])
+        return contributions, base + self.base_margin
+
+
+COMPILED_KINDS = {cls.kind: cls for cls in (CompiledLinear, CompiledForest, CompiledBoosted)}
+
+
+# ------------------------------------------------------------------ #
+# 2. EXPORT  (estimator  ->  arrays)
+# ------------------------------------------------------------------ #
+def _split_pipeline(estimator):
+    """Return (StandardScaler or None, final estimator)."""
+    steps = getattr(estimator, "steps", None)
+    if steps is None:
+        return None, estimator
+    *pre, (_, final) = steps
+    if not pre:
+        return None, final
+    if len(pre) != 1 or type(pre[0][1]).__name__ != "StandardScaler":
+        raise UnsupportedModelError(f"unsupported preprocessing: {[name for name, _ in pre]}")
+    return pre[0][1], final
+
+
+def _scaler_arrays(scaler, n_features: int):
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    return (
+        np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64),
+        np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64),
+    )
+
+
+def _compile_linear(scaler, clf) -> CompiledLinear:
+    coef = np.asarray(clf.coef_, dtype=np.float64).ravel()
+    intercept = float(np.ravel(clf.intercept_)[0])
+    mean = np.zeros(coef.shape[0])
+    if scaler is not None:
+        mean, std = _scaler_arrays(scaler, coef.shape[0])
+        coef = coef / std
+        intercept -= float(coef @ mean)
+    return CompiledLinear(
+        # the scaler mean isn't needed to score, only to explain (see CompiledLinear.contributions)
+        {"coef": coef, "intercept": np.array([intercept]), "scale_mean": mean},
+        {"kind": "linear", "classes": clf.classes_.tolist()},
+    )
+
+
+def _flatten_trees(trees):
+    """
+    trees: iterable of (feature, threshold, left, right, extras) in local node ids.
+    Returns global arrays with leaves turned into self-loops.
+    """
+    feature, threshold, left, right, roots, extras = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for f, t, l, r, extra in trees:
+        n = f.shape[0]
+        is_leaf = l < 0
+        local = np.arange(n)
+        feature.append(np.where(is_leaf, 0, f))
+        threshold.append(t)
+        left.append(np.where(is_leaf, local, l) + offset)
+        right.append(np.where(is_leaf, local, r) + offset)
+        extras.append(extra)
+        roots.append(offset)
+        max_depth = max(max_depth, _tree_depth(l, r))
+        offset += n
+    return (
+        np.concatenate(feature).astype(np.intp),
+        np.concatenate(threshold),
+        np.concatenate(left).astype(np.intp),
+        np.concatenate(right).astype(np.intp),
+        np.asarray(roots, dtype=np.intp),
+        extras,
+        max_depth,
+    )
+
+
+def _tree_lookups(left, right) -> dict:
+    return {
+        # children[2 * node + went_right]: one gather per step instead of two plus a select
+        "children": np.column_stack([left, right]).ravel(),
+        "is_leaf": left == np.arange(left.shape[0]),
+    }
+
+
+def _tree_depth(left, right) -> int:
+    depth = np.zeros(left.shape[0], dtype=np.intp)
+    # children always have larger ids than their parent in both sklearn and XGBoost
+    for node in range(left.shape[0]):
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def _node_means(left, right, leaf_value, cover) -> np.ndarray:
+    """Cover-weighted mean leaf value under every node (what the tree predicts before that node's split)."""
+    mean = leaf_value.copy()
+    for node in range(left.shape[0] - 1, -1, -1):
+        if left[node] >= 0:
+            l, r = left[node], right[node]
+            total = cover[l] + cover[r]
+            mean[node] = (cover[l] * mean[l] + cover[r] * mean[r]) / total if total else (mean[l] + mean[r]) / 2
+    return mean
+
+
+def _compile_forest(scaler, clf) -> CompiledForest:
+    def trees():
+        for est in clf.estimators_:
+            t = est.tree_
+            value = t.value[:, 0, :].astype(np.float64)
+            total = value.sum(axis=1, keepdims=True)
+            total[total == 0] = 1.0
+            yield t.feature, t.threshold.astype(np.float64), t.children_left, t.children_right, value / total
+
+    feature, threshold, left, right, roots, values, max_depth = _flatten_trees(trees())
+    arrays = {
+        "feature": feature, "threshold": threshold, "left": left, "right": right,
+        "roots": roots, "value": np.concatenate(values), **_tree_lookups(left, right),
+    }
+    if scaler is not None:
+        arrays["scale_mean"], arrays["scale_std"] = _scaler_arrays(scaler, clf.n_features_in_)
+    return CompiledForest(arrays, {"kind": "forest", "classes": clf.classes_.tolist(), "max_depth": max_depth})
+
+
+def _compile_xgb(scaler, clf) -> CompiledBoosted:
+    learner = json.loads(bytes(clf.get_booster().save_raw("json")))["learner"]
+    if learner["objective"]["name"] != "binary:logistic":
+        raise UnsupportedModelError(f"unsupported objective: {learner['objective']['name']}")
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise UnsupportedModelError(f"unsupported booster: {learner['gradient_booster']['name']}")
+
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+    base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+    def trees():
+        for tree in learner["gradient_booster"]["model"]["trees"]:
+            left = np.asarray(tree["left_children"], dtype=np.intp)
+            right = np.asarray(tree["right_children"], dtype=np.intp)
+            cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+            default_left = np.asarray(tree["default_left"], dtype=bool)
+            # leaves keep their output in split_conditions
+            leaf_value = np.where(left < 0, cond, 0).astype(np.float64)
+            cover = np.asarray(tree["sum_hessian"], dtype=np.float64)
+            extra = (leaf_value, default_left, _node_means(left, right, leaf_value, cover))
+            yield np.asarray(tree["split_indices"], dtype=np.intp), cond, left, right, extra
+
+    feature, threshold, left, right, roots, extras, max_depth = _flatten_trees(trees())
+    arrays = {
+        "feature": feature, "threshold": threshold.astype(np.float32), "left": left, "right": right,
+        "roots": roots,
+        "value": np.concatenate([v for v, _, _ in extras]),
+        "default_left": np.concatenate([d for _, d, _ in extras]),
+        "node_mean": np.concatenate([m for _, _, m in extras]),
+        **_tree_lookups(left, right),
+    }
+    if scaler is not None:
+        arrays["scale_mean"], arrays["scale_std"] = _scaler_arrays(scaler, clf.n_features_in_)
+    meta = {"kind": "boosted", "classes": clf.classes_.tolist(), "max_depth": max_depth, "base_margin": base_margin}
+    return CompiledBoosted(arrays, meta)
+
+
+def compile_model(estimator) -> CompiledModel:
+    """Turn a fitted LR / RF pipeline or XGBClassifier into its array form."""
+    scaler, clf = _split_pipeline(estimator)
+    name = type(clf).__name__
+    if name == "LogisticRegression":
+        if clf.coef_.shape[0] != 1:
+            raise UnsupportedModelError("only binary LogisticRegression is supported")
+        return _compile_linear(scaler, clf)
+    if name == "RandomForestClassifier":
+        return _compile_forest(scaler, clf)
+    if name == "XGBClassifier":
+        return _compile_xgb(scaler, clf)
+    raise UnsupportedModelError(f"no compiled form for {name}")
+
+
+# ------------------------------------------------------------------ #
+# 3. PERSISTENCE
+# ------------------------------------------------------------------ #
+def save_compiled(compiled: CompiledModel, fh):
+    np.savez(fh, __meta__=np.frombuffer(json.dumps(compiled.meta).encode(), dtype=np.uint8), **compiled.arrays)
+
+
+def load_compiled(fh) -> CompiledModel:
+    with np.load(fh, allow_pickle=False) as npz:
+        arrays = {k: npz[k] for k in npz.files if k != "__meta__"}
+        meta = json.loads(npz["__meta__"].tobytes().decode())
+    return COMPILED_KINDS[meta["kind"]](arrays, meta)
+
+
+COMPILED_META_FILE = "meta.json"
+
+
+def save_compiled_dir(compiled: CompiledModel, path: str):
+    """
+    One uncompressed .npy per array plus meta.json in `path`, so the arrays
+    can be memory-mapped by load_compiled_dir.
+    """
+    os.makedirs(path, exist_ok=True)
+    for name, array in compiled.arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(path, COMPILED_META_FILE), "w") as fh:
+        json.dump(compiled.meta, fh)
+
+
+def load_compiled_dir(path: str, mmap: bool = True) -> CompiledModel:
+    """
+    Open a save_compiled_dir artifact. With `mmap` the arrays are read-only
+    views of the files, so every process serving the same version shares
+    one page-cache copy and loading costs a few syscalls per array.
+    """
+    with open(os.path.join(path, COMPILED_META_FILE)) as fh:
+        meta = json.load(fh)
+    arrays = {
+        name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode="r" if mmap else None, allow_pickle=False)
+        for name in sorted(os.listdir(path)) if name.endswith(".npy")
+    }
+    return COMPILED_KINDS[meta["kind"]](arrays, meta)
+
+
+def check_parity(estimator, compiled: CompiledModel, X, atol: float = 1e-6) -> dict:
+    """Compare the compiled form against the original estimator on `X`."""
+    X = np.asarray(X, dtype=np.float64)
+    expected = estimator.predict_proba(X)
+    got = compiled.predict_proba(X)
+    same_classes = bool(np.array_equal(estimator.predict(X), compiled.predict(X)))
+    max_abs_diff = float(np.abs(expected - got).max()) if len(X) else 0.0
+    return {"same_classes": same_classes, "max_abs_diff": max_abs_diff, "ok": same_classes and max_abs_diff <= atol}
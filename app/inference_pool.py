@@ -0,0 +1,263 @@
+# app/inference_pool.py
+#
+# Optional process-pool inference (INFERENCE_EXECUTOR=process). Each worker
+# process loads the published model itself and keeps it resident, so scoring
+# runs outside the API process's GIL. Feature rows and probabilities travel
+# through a shared-memory segment split into fixed slots; only a few integers
+# and the model version are pickled per call. The number of slots bounds the
+# work in flight: a caller that can't get a slot within `acquire_timeout`
+# gets InferencePoolBusyError (a 503) instead of queueing without limit.
+
+import dataclasses
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from app.model_registry import ModelLoadError
+
+N_FEATURES = 13
+N_CLASSES = 2
+
+
+class InferencePoolBusyError(RuntimeError):
+    pass
+
+
+# ------------------------------------------------------------------ #
+# WORKER PROCESS
+# ------------------------------------------------------------------ #
+_shm = None
+_slot_layout = None
+_registries = {}
+_resident = {}  # model_dir -> {version: LoadedModel}, newest last
+RESIDENT_VERSIONS = 2  # the published version plus the one in-flight requests may still be pinned to
+
+
+def _init_worker(shm_name: str, slot_layout: tuple, model_dir: Optional[str]):
+    global _shm, _slot_layout
+    # spawned workers share the parent's resource tracker, so attaching here doesn't
+    # register a second owner; the parent unlinks the segment in close()
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _slot_layout = slot_layout
+    if model_dir is not None:
+        try:
+            _loaded(model_dir, None)
+        except Exception as e:
+            print(f"⚠️ Inference worker {os.getpid()} started without a model: {e}")
+
+
+def _loaded(model_dir: str, version: Optional[str]):
+    """The model for `version` exactly (or the published one when None), loaded once per worker."""
+    from app.inference import warm_up
+    from app.model_registry import ModelRegistry
+
+    # one key per directory however it was spelled (MODEL_DIR may be relative; bind() sends absolute paths)
+    model_dir = os.path.abspath(model_dir)
+    registry = _registries.get(model_dir)
+    if registry is None:
+        registry = _registries[model_dir] = ModelRegistry(
+            model_dir=model_dir, prefer_compiled=os.getenv("SERVE_COMPILED", "1") == "1",
+            mmap=os.getenv("MODEL_MMAP", "1") == "1")
+    resident = _resident.setdefault(model_dir, {})
+    if version is None:
+        loaded = registry.reload()
+    elif version in resident:
+        return resident[version]
+    else:
+        # never registry.reload() here: VERSION may already point past the requested model
+        loaded = registry.load(version)
+    if loaded.version not in resident:
+        warm_up(loaded.model)
+        resident[loaded.version] = loaded
+        while len(resident) > RESIDENT_VERSIONS:
+            del resident[next(iter(resident))]
+    return resident[loaded.version]
+
+
+def _resident_versions() -> dict:
+    """{model_dir: [versions]} held by this worker."""
+    return {model_dir: list(resident) for model_dir, resident in _resident.items()}
+
+
+def _slot_views(slot: int, n_rows: int):
+    slot_bytes, max_rows = _slot_layout
+    offset = slot * slot_bytes
+    features = np.ndarray((n_rows, N_FEATURES), dtype=np.float64, buffer=_shm.buf, offset=offset)
+    proba = np.ndarray((n_rows, N_CLASSES), dtype=np.float64, buffer=_shm.buf,
+                       offset=offset + max_rows * N_FEATURES * 8)
+    return features, proba
+
+
+def _score_slot(slot: int, n_rows: int, model_dir: str, version: str) -> str:
+    """Score the rows in `slot` in place; returns the model version that scored them."""
+    loaded = _loaded(model_dir, version)
+    features, proba = _slot_views(slot, n_rows)
+    proba[:] = loaded.model.predict_proba(features)
+    return loaded.version
+
+
+# ------------------------------------------------------------------ #
+# API PROCESS
+# ------------------------------------------------------------------ #
+class PooledModel:
+    """Stands in for a resident model; predict_proba is answered by the pool's workers."""
+
+    def __init__(self, pool: "InferencePool", model_dir: str, version: str, resident):
+        self.pool = pool
+        self.model_dir = model_dir
+        self.version = version
+        self.resident = resident  # this process's copy; used for explanations
+        self.classes_ = np.asarray(getattr(resident, "classes_", [0, 1]))
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.pool.predict_proba(self.model_dir, self.version, X)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class InferencePool:
+    """
+    `workers` processes sharing `slots` buffers of `max_rows` rows each;
+    larger inputs are split across slots.
+    """
+
+    def __init__(self, workers: int = 2, slots: int = 4, max_rows: int = 1024,
+                 acquire_timeout: float = 1.0, model_dir: Optional[str] = None):
+        self.workers = workers
+        self.slots = max(slots, workers)
+        self.max_rows = max_rows
+        self.acquire_timeout = acquire_timeout
+        self.model_dir = os.path.abspath(model_dir) if model_dir is not None else None
+        self.slot_bytes = max_rows * (N_FEATURES + N_CLASSES) * 8
+
+        self._shm = None
+        self._executor = None
+        self._free = queue.Queue()
+        self._lock = threading.Lock()
+        self._bound = None  # (LoadedModel, pooled LoadedModel) for the latest version
+
+        self.calls = 0
+        self.rows = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    # ---------- lifecycle ------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+            for slot in range(self.slots):
+                self._free.put(slot)
+            self._executor = self._new_executor()
+
+    def _new_executor(self):
+        # spawn, not fork: the API process has threads (batcher, writer, threadpool) by now
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._shm.name, (self.slot_bytes, self.max_rows), self.model_dir),
+        )
+
+    def close(self):
+        with self._lock:
+            if self._executor is None:
+                return
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            self._free = queue.Queue()
+            self._bound = None
+
+    # ---------- scoring --------------------------------------------
+    def bind(self, loaded):
+        """The LoadedModel to serve from: same version and path, scored by the pool."""
+        bound = self._bound
+        if bound is not None and bound[0] is loaded:
+            return bound[1]
+        self.start()
+        model_dir = os.path.dirname(os.path.abspath(loaded.path))
+        pooled = dataclasses.replace(loaded, model=PooledModel(self, model_dir, loaded.version, loaded.model))
+        self._bound = (loaded, pooled)
+        return pooled
+
+    def predict_proba(self, model_dir: str, version: str, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != N_FEATURES:
+            raise ValueError(f"expected (n, {N_FEATURES}) features, got {X.shape}")
+        if len(X) <= self.max_rows:
+            return self._score_chunk(model_dir, version, X)
+        return np.concatenate([self._score_chunk(model_dir, version, X[i:i + self.max_rows])
+                               for i in range(0, len(X), self.max_rows)])
+
+    def _score_chunk(self, model_dir: str, version: str, X: np.ndarray) -> np.ndarray:
+        try:
+            slot = self._free.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            self.rejected += 1
+            raise InferencePoolBusyError(f"all {self.slots} inference slots busy")
+        try:
+            offset = slot * self.slot_bytes
+            n = len(X)
+            np.ndarray(X.shape, dtype=np.float64, buffer=self._shm.buf, offset=offset)[:] = X
+            try:
+                scored_by = self._executor.submit(_score_slot, slot, n, model_dir, version).result()
+            except BrokenProcessPool:
+                self._restart()
+                raise
+            proba = np.ndarray((n, N_CLASSES), dtype=np.float64, buffer=self._shm.buf,
+                               offset=offset + self.max_rows * N_FEATURES * 8).copy()
+        finally:
+            self._free.put(slot)
+        if scored_by != version:
+            raise ModelLoadError(f"requested model {version}, worker scored with {scored_by}")
+        self.calls += 1
+        self.rows += n
+        return proba
+
+    def _restart(self):
+        with self._lock:
+            if self._executor is not None and getattr(self._executor, "_broken", False):
+                print("⚠️ Inference worker died; restarting the pool")
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                self.restarts += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "slots": self.slots,
+            "free_slots": self._free.qsize(),
+            "max_rows": self.max_rows,
+            "calls": self.calls,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+
+def create_inference_pool():
+    if os.getenv("INFERENCE_EXECUTOR", "thread") != "process":
+        return None
+    workers = int(os.getenv("INFERENCE_WORKERS", "0")) or os.cpu_count() or 1
+    return InferencePool(
+        workers=workers,
+        slots=int(os.getenv("INFERENCE_SLOTS", "0")) or 2 * workers,
+        max_rows=int(os.getenv("INFERENCE_MAX_ROWS", "1024")),
+        acquire_timeout=float(os.getenv("INFERENCE_QUEUE_TIMEOUT_MS", "1000")) / 1000,
+        model_dir=os.path.abspath(os.getenv("MODEL_DIR", "models")),
+    )
+
+
+inference_pool = create_inference_pool()
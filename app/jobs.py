@@ -0,0 +1,191 @@
+# app/jobs.py
+
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.model_registry import registry, ModelNotFoundError, ModelLoadError
+from app.metrics import RETRAIN_SECONDS
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAIN_COMMAND = [sys.executable, "-m", "ml.train_model"]
+MODE_ARGS = {"full": [], "incremental": ["--incremental"]}
+PROGRESS_PREFIX = "[progress]"
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class TrainingJob:
+    id: str
+    requested_by: str
+    mode: str = "full"
+    status: str = QUEUED
+    stage: str = "queued"
+    progress: float = 0.0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    returncode: Optional[int] = None
+    model_version: Optional[str] = None
+    error: Optional[str] = None
+    log_tail: deque = field(default_factory=lambda: deque(maxlen=20))
+    cancel_requested: bool = False
+    process: Optional[subprocess.Popen] = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        return {
+            "job_id": self.id,
+            "mode": self.mode,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "requested_by": self.requested_by,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": (self.started_at or now) - self.created_at,
+            "run_seconds": (self.finished_at or now) - self.started_at if self.started_at else None,
+            "returncode": self.returncode,
+            "model_version": self.model_version,
+            "error": self.error,
+            "log_tail": list(self.log_tail),
+        }
+
+
+class TrainingJobManager:
+    """
+    Runs ml/train_model.py in a child process, one job at a time, so the
+    API's own threads never block on training. The child runs at a lower
+    CPU priority so it doesn't starve request handling.
+    """
+
+    def __init__(self, max_queued: int = 4, history: int = 50, nice: int = 10):
+        self.max_queued = max_queued
+        self.history = history
+        self.nice = nice
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrain")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- public API -----------------------------------------
+    def submit(self, user: str, mode: str = "full") -> TrainingJob:
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+            if pending >= self.max_queued:
+                raise JobQueueFullError(f"{pending} retrain jobs already pending")
+            job = TrainingJob(id=uuid.uuid4().hex, requested_by=user, mode=mode)
+            self._jobs[job.id] = job
+            self._trim_history()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        with self._lock:
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED, stage="cancelled before start")
+        process = job.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+        return job
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            self.cancel(job.id)
+        self._executor.shutdown(wait=True)
+
+    # ---------- worker ---------------------------------------------
+    def _run(self, job: TrainingJob):
+        with self._lock:
+            if job.cancel_requested:
+                return
+            job.status, job.stage, job.started_at = RUNNING, "starting", time.time()
+
+        try:
+            job.process = subprocess.Popen(
+                TRAIN_COMMAND + MODE_ARGS[job.mode],
+                cwd=PROJECT_ROOT,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                env=dict(os.environ, PYTHONUNBUFFERED="1"),
+                preexec_fn=self._lower_priority if os.name == "posix" else None,
+            )
+            if job.cancel_requested:
+                job.process.terminate()
+            for line in job.process.stdout:
+                self._record_output(job, line.rstrip())
+            job.returncode = job.process.wait()
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+            return
+
+        if job.cancel_requested:
+            self._finish(job, CANCELLED, stage="cancelled")
+        elif job.returncode != 0:
+            self._finish(job, FAILED, error=f"train_model exited with code {job.returncode}")
+        else:
+            # pick the new version up right away instead of waiting for the next version check
+            try:
+                job.model_version = registry.reload().version
+            except (ModelNotFoundError, ModelLoadError) as e:
+                self._finish(job, FAILED, error=f"trained model could not be loaded: {e}")
+                return
+            self._finish(job, SUCCEEDED, stage="done", progress=1.0)
+
+    def _lower_priority(self):
+        os.nice(self.nice)
+
+    def _record_output(self, job: TrainingJob, line: str):
+        job.log_tail.append(line)
+        # "[progress] 0.40 tuning XGBoost" lines come from ml/train_model.report_progress
+        if line.startswith(PROGRESS_PREFIX):
+            fraction, _, stage = line[len(PROGRESS_PREFIX):].strip().partition(" ")
+            try:
+                job.progress = float(fraction)
+            except ValueError:
+                pass
+            job.stage = stage or job.stage
+
+    def _finish(self, job: TrainingJob, status: str, stage: str = None, error: str = None, progress: float = None):
+        job.status = status
+        job.finished_at = time.time()
+        if job.started_at is not None:
+            RETRAIN_SECONDS.observe(job.finished_at - job.started_at, job.mode, status)
+        job.stage = stage or status
+        job.error = error
+        if progress is not None:
+            job.progress = progress
+        job.process = None
+
+    def _trim_history(self):
+        finished = [job_id for job_id, j in self._jobs.items() if j.status in FINISHED]
+        for job_id in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+
+job_manager = TrainingJobManager(
+    max_queued=int(os.getenv("RETRAIN_MAX_QUEUED", "4")),
+    nice=int(os.getenv("RETRAIN_NICE", "10")),
+)
@@ -0,0 +1,246 @@
+# app/llm_advice.py
+#
+# Lifestyle advice for a prediction. The text generator is pluggable
+# (ADVICE_BACKEND): "template" is a deterministic local stub, "huggingface"
+# calls the Hugging Face Inference API. Calls are async, capped by a
+# semaphore, cached on the prediction plus bucketed patient features, and
+# identical in-flight requests share one backend call. A call that misses
+# its deadline or fails is answered from the template instead.
+
+import asyncio
+import math
+import os
+from typing import Optional
+
+from app.cache import PredictionCache
+from app.schemas import HEART_FEATURES
+
+# bucket widths for continuous features; the rest are categorical codes
+FEATURE_BUCKETS = {"age": 10, "trestbps": 10, "chol": 20, "thalch": 10, "oldpeak": 0.5}
+
+DISCLAIMER = "This is general guidance, not a diagnosis; please review it with your doctor."
+
+
+def normalize_prediction(prediction) -> str:
+    # the frontend sends "1"/"0"; older clients send the display label
+    text = str(prediction).strip()
+    if text in ("1", "0"):
+        return text
+    return "0" if "no" in text.lower() else "1"
+
+
+def bucket_features(patient_data: dict) -> tuple:
+    """(name, lower bound or code) for each feature; patients in the same buckets share advice."""
+    buckets = []
+    for name in HEART_FEATURES:
+        try:
+            value = float(patient_data.get(name))
+            if not math.isfinite(value):
+                raise ValueError(f"{name} is not finite")  # "inf"/"nan" parse but can't be bucketed
+        except (TypeError, ValueError):
+            buckets.append((name, None))
+            continue
+        width = FEATURE_BUCKETS.get(name)
+        buckets.append((name, math.floor(value / width) * width if width else int(value)))
+    return tuple(buckets)
+
+
+def describe(buckets: tuple) -> str:
+    parts = []
+    for name, low in buckets:
+        if low is None:
+            continue
+        width = FEATURE_BUCKETS.get(name)
+        parts.append(f"{name} {low:g}-{low + width:g}" if width else f"{name} {low}")
+    return ", ".join(parts)
+
+
+# ---------- backends -----------------------------------------------
+class TemplateBackend:
+    """
+    Deterministic rule-based advice; the local stub and the timeout fallback.
+    `delay` simulates LLM latency for load tests.
+    """
+
+    name = "template"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def generate(self, prediction: str, buckets: tuple) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.render(prediction, buckets)
+
+    @staticmethod
+    def render(prediction: str, buckets: tuple) -> str:
+        b = dict(buckets)
+        tips = []
+        if prediction == "1":
+            tips.append("The model flags an elevated risk of heart disease; book a cardiology check-up soon.")
+        else:
+            tips.append("The model does not flag heart disease; keep up regular check-ups.")
+        if b.get("chol") is not None and b["chol"] >= 240:
+            tips.append("Cholesterol is high: favour fibre, vegetables and unsaturated fats, and limit saturated fat.")
+        if b.get("trestbps") is not None and b["trestbps"] >= 130:
+            tips.append("Resting blood pressure is raised: cut back on salt and alcohol and monitor it at home.")
+        if b.get("fbs") == 1:
+            tips.append("Fasting blood sugar is elevated: ask about diabetes screening and limit refined sugar.")
+        if b.get("exang") == 1 or (b.get("oldpeak") is not None and b["oldpeak"] >= 2):
+            tips.append("Exercise-related chest symptoms were recorded: avoid strenuous exercise until cleared by a doctor.")
+        else:
+            tips.append("Aim for about 150 minutes of moderate activity per week.")
+        if b.get("age") is not None and b["age"] >= 60:
+            tips.append("At this age, yearly heart and blood-pressure screening is worthwhile.")
+        tips.append("Don't smoke, sleep 7-9 hours and keep a healthy weight.")
+        return " ".join(tips + [DISCLAIMER])
+
+
+class HuggingFaceBackend:
+    """Text generation through the Hugging Face Inference API."""
+
+    name = "huggingface"
+    API_URL = "https://api-inference.huggingface.co/models/{model}"
+
+    def __init__(self, model: str, token: Optional[str] = None, max_new_tokens: int = 200):
+        self.model = model
+        self.token = token
+        self.max_new_tokens = max_new_tokens
+
+    async def generate(self, prediction: str, buckets: tuple) -> str:
+        import httpx  # only this backend needs it; keeps it off the API's start-up path
+
+        risk = "at elevated risk of" if prediction == "1" else "not predicted to have"
+        prompt = (
+            f"A patient ({describe(buckets)}) is {risk} heart disease according to a screening model. "
+            "Give three short, practical lifestyle recommendations."
+        )
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                self.API_URL.format(model=self.model),
+                json={"inputs": prompt, "parameters": {"max_new_tokens": self.max_new_tokens,
+                                                       "return_full_text": False}},
+                headers=headers,
+            )
+            response.raise_for_status()
+        return response.json()[0]["generated_text"].strip() + " " + DISCLAIMER
+
+
+# ---------- service ------------------------------------------------
+class AdviceService:
+    """
+    Front for an advice backend: cache, concurrency cap, in-flight
+    coalescing and a `timeout` after which the templated advice is returned.
+    A call that times out keeps running and fills the cache for next time.
+    """
+
+    def __init__(self, backend, max_concurrency: int = 4, timeout: float = 5.0,
+                 cache_size: int = 1000, cache_ttl: float = 3600.0):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+        self._loop = None
+        self._semaphore = None
+        self._in_flight = {}
+
+        self.requests = 0
+        self.backend_calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def get_advice(self, prediction, patient_data: dict) -> dict:
+        """Returns {"advice": str, "source": "cache" | backend name | "fallback"}."""
+        self.requests += 1
+        prediction = normalize_prediction(prediction)
+        buckets = bucket_features(patient_data)
+        key = (prediction, buckets)
+
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return {"advice": cached, "source": "cache"}
+
+        self._bind_loop()
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call_backend(key, prediction, buckets))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+
+        try:
+            # shield: one caller giving up must not cancel the call others are waiting on
+            advice = await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return {"advice": TemplateBackend.render(prediction, buckets), "source": "fallback"}
+        except Exception as e:
+            print(f"⚠️ Advice backend failed: {e}")
+            return {"advice": TemplateBackend.render(prediction, buckets), "source": "fallback"}
+        return {"advice": advice, "source": self.backend.name}
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "requests": self.requests,
+            "backend_calls": self.backend_calls,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    async def _call_backend(self, key, prediction: str, buckets: tuple) -> str:
+        async with self._semaphore:
+            self.backend_calls += 1
+            advice = await self.backend.generate(prediction, buckets)
+        if self.cache is not None:
+            self.cache.put(key, advice)
+        return advice
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def _bind_loop(self):
+        # asyncio primitives belong to one event loop; start fresh if the app moved to another
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._in_flight = {}
+
+
+def create_backend():
+    name = os.getenv("ADVICE_BACKEND", "template")
+    if name == "huggingface":
+        return HuggingFaceBackend(
+            model=os.getenv("HF_MODEL", "HuggingFaceH4/zephyr-7b-beta"),
+            token=os.getenv("HF_API_TOKEN"),
+        )
+    return TemplateBackend(delay=float(os.getenv("ADVICE_TEMPLATE_DELAY_MS", "0")) / 1000)
+
+
+def create_advice_service():
+    return AdviceService(
+        create_backend(),
+        max_concurrency=int(os.getenv("ADVICE_MAX_CONCURRENCY", "4")),
+        timeout=float(os.getenv("ADVICE_TIMEOUT_MS", "5000")) / 1000,
+        cache_size=int(os.getenv("ADVICE_CACHE_SIZE", "1000")),
+        cache_ttl=float(os.getenv("ADVICE_CACHE_TTL", "3600")),
+    )
+
+
+advice_service = create_advice_service()
+
+
+async def get_llm_advice(prediction, patient_data: dict) -> str:
+    return (await advice_service.get_advice(prediction, patient_data))["advice"]
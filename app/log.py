@@ -0,0 +1,32 @@
+# app/log.py
+#
+# Structured (one JSON object per line) logging with per-call-site sampling,
+# for hot paths where a log line per request would cost more than the work.
+
+import json
+import logging
+import os
+import random
+import sys
+
+_root = logging.getLogger("heartwatch")
+if not _root.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    _root.addHandler(_handler)
+    _root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    _root.propagate = False
+
+
+class SampledLogger:
+    """Emits roughly `rate` of the events passed to it (1 = all, 0 = none)."""
+
+    def __init__(self, name: str, rate: float):
+        self.logger = _root.getChild(name)
+        self.rate = rate
+
+    def event(self, event: str, **fields):
+        if self.rate <= 0 or (self.rate < 1 and random.random() >= self.rate):
+            return
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(json.dumps({"event": event, "sample_rate": self.rate, **fields}, default=str))
@@ -1,20 +1,88 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from . import auth, database, models
 from app.schemas import User, Token
-from app.routes import predict, feedback, train
+from app.routes import predict, feedback, train, advise, metrics
 from sqlalchemy.orm import Session
-import uvicorn
 from app.database import engine
 from app import models
+from app.model_registry import registry, ModelNotFoundError, ModelLoadError
+from app.jobs import job_manager
+from app.feedback_writer import feedback_writer
+from app.feedback_store import ensure_content_hash
+from app.metrics import MetricsMiddleware
+from app.tracing import TracingMiddleware
+from app.inference import WARMUP_ROW, warm_up
+from app.batching import batcher
+from app.inference_pool import inference_pool
+import numpy as np
+import os
+import time
 
-models.Base.metadata.create_all(bind=engine)
+WARMUP_ROWS = int(os.getenv("WARMUP_ROWS", "64"))
+
+
+def prepare_database():
+    models.Base.metadata.create_all(bind=engine)
+    ensure_content_hash(engine)  # 🧬 older feedback.db files predate the dedup column
+
+
+def preload_model():
+    # 🧠 keep the model resident and warmed so the first /predict pays for neither
+    try:
+        loaded = registry.reload()
+    except (ModelNotFoundError, ModelLoadError) as e:
+        print(f"⚠️ No model loaded at startup: {e}")
+        return
+    if inference_pool is not None:
+        loaded = inference_pool.bind(loaded)  # ⚙️ spawns the workers, which load the model themselves
+    seconds = warm_up(loaded.model, rows=WARMUP_ROWS)
+    if batcher is not None:
+        batcher.predict(loaded.model, np.asarray([WARMUP_ROW], dtype=np.float64))  # starts its worker thread
+    print(f"✅ Loaded model version {loaded.version} (warm-up {seconds * 1000:.1f} ms)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    app.state.ready = False
+    await run_in_threadpool(prepare_database)
+    await run_in_threadpool(preload_model)
+    app.state.startup_seconds = time.perf_counter() - started
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    job_manager.shutdown()  # 🛑 don't leave a training child process behind
+    if inference_pool is not None:
+        inference_pool.close()
+    if feedback_writer is not None:
+        feedback_writer.close()  # 💾 flush buffered feedback before the process exits
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(TracingMiddleware)  # ⏱️ opt-in stage timings (X-Trace: 1)
+app.add_middleware(MetricsMiddleware)  # 📈 per-route latency histograms
+
+
+@app.get("/ready")
+def ready():
+    # 🚦 readiness probe: startup finished and a model is resident
+    if not getattr(app.state, "ready", False):
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if registry.version is None:
+        return JSONResponse({"status": "no_model"}, status_code=503)
+    return {"status": "ready", "model_version": registry.version,
+            "startup_seconds": round(app.state.startup_seconds, 3)}
 
-app = FastAPI()
 app.include_router(auth.router)      # ✅ JWT + Basic auth routes
 app.include_router(predict.router)   # 🧠 prediction
 app.include_router(feedback.router)  # 💬 feedback
 app.include_router(train.router)     # 🧠 train
 app.include_router(advise.router)     # 🧠 advise
+app.include_router(metrics.router)    # 📈 metrics
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", reload=True)
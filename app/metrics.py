@@ -0,0 +1,166 @@
+# app/metrics.py
+#
+# Minimal Prometheus instrumentation: counters and histograms updated on the
+# hot path with one lock each, plus collectors that read existing stats()
+# (caches, batcher, writer queue) only when /metrics is scraped.
+
+import bisect
+import threading
+import time
+
+# seconds; covers sub-millisecond inference up to multi-minute retrains
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 3600)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in sorted(self._series.items())]
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = _labels(self.labelnames + ("le",), labels + (bound,))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class StatsCollector:
+    """
+    Exposes numeric fields of an existing `stats()` dict as gauges at scrape
+    time, e.g. prediction_cache_hits from prediction_cache.stats()["hits"].
+    """
+
+    def __init__(self, prefix: str, help: str, source, fields):
+        self.prefix, self.help, self.source, self.fields = prefix, help, source, fields
+
+    def render(self):
+        stats = self.source()
+        if not stats:
+            return
+        for field in self.fields:
+            value = stats.get(field)
+            if isinstance(value, (int, float)):
+                yield f"# HELP {self.prefix}_{field} {self.help} ({field})"
+                yield f"# TYPE {self.prefix}_{field} gauge"
+                yield f"{self.prefix}_{field} {value}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_LATENCY = metrics.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")))
+MODEL_LOAD_SECONDS = metrics.register(Histogram(
+    "model_load_seconds", "Time to read, verify and deserialize a model version", ("source",)))
+INFERENCE_SECONDS = metrics.register(Histogram(
+    "inference_seconds", "Model scoring time per call", ("path",)))
+INFERENCE_ROWS = metrics.register(Histogram(
+    "inference_rows", "Rows scored per model call", ("path",), SIZE_BUCKETS))
+FEEDBACK_INSERT_SECONDS = metrics.register(Histogram(
+    "feedback_insert_seconds", "Feedback insert transaction time", ("path",)))
+FEEDBACK_ROWS = metrics.register(Counter(
+    "feedback_rows_total", "Feedback rows by insert outcome", ("outcome",)))
+RETRAIN_SECONDS = metrics.register(Histogram(
+    "retrain_duration_seconds", "Retrain job run time", ("mode", "status"), SLOW_BUCKETS))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template (not raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(time.perf_counter() - started, scope["method"],
+                                    getattr(route, "path", "unmatched"), status[0])
@@ -0,0 +1,299 @@
+# app/model_registry.py
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from app.inference import load_compiled, load_compiled_dir, save_compiled_dir
+from app.metrics import MODEL_LOAD_SECONDS
+
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+LEGACY_MODEL_FILE = "model.pkl"
+VERSION_FILE = "VERSION"
+KEEP_VERSIONS = 3
+
+
+class ModelNotFoundError(RuntimeError):
+    pass
+
+
+class ModelLoadError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """Immutable snapshot of a resident model; requests hold on to one for their whole lifetime."""
+    model: Any
+    version: str
+    path: str
+    loaded_at: float
+    source: str = "pickle"        # "pickle" or "compiled"
+
+
+# ------------------------------------------------------------------ #
+# PUBLISHING (used by ml/train_model.py)
+# ------------------------------------------------------------------ #
+def _atomic_write(path: str, data: bytes):
+    # write to a temp file in the same directory, fsync, then rename over the target
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _dir_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        h.update(name.encode())
+        with open(os.path.join(path, name), "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def _atomic_write_compiled(path: str, compiled) -> str:
+    """Write a compiled model directory under a temp name, fsync it, rename it into place; returns its sha256."""
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        save_compiled_dir(compiled, tmp_path)
+        for name in os.listdir(tmp_path):
+            with open(os.path.join(tmp_path, name), "rb") as fh:
+                os.fsync(fh.fileno())
+        sha256 = _dir_sha256(tmp_path)
+        if os.path.isdir(path):
+            # same version = same pickle bytes, so the published arrays are already these
+            shutil.rmtree(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return sha256
+
+
+def publish_model(model, model_dir: str = MODEL_DIR, compiled=None) -> str:
+    """
+    Serialize `model` into an immutable, versioned artifact and flip the
+    VERSION pointer to it. Readers only ever see complete files. When a
+    compiled form is given it is published next to the pickle, as a
+    directory of uncompressed .npy arrays that servers memory-map, and is
+    preferred for serving.
+
+    Returns:
+        the new version string
+    """
+    import joblib
+
+    os.makedirs(model_dir, exist_ok=True)
+
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    data = buf.getvalue()
+    sha256 = hashlib.sha256(data).hexdigest()
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{sha256[:12]}"
+    filename = f"model-{version}.pkl"
+
+    _atomic_write(os.path.join(model_dir, filename), data)
+    # keep the legacy path in sync for scripts that still load it directly
+    _atomic_write(os.path.join(model_dir, LEGACY_MODEL_FILE), data)
+
+    manifest = {
+        "version": version,
+        "file": filename,
+        "sha256": sha256,
+        "published_at": time.time(),
+    }
+    if compiled is not None:
+        manifest["compiled"] = f"model-{version}.arrays"
+        manifest["compiled_sha256"] = _atomic_write_compiled(os.path.join(model_dir, manifest["compiled"]), compiled)
+
+    _atomic_write(os.path.join(model_dir, VERSION_FILE), json.dumps(manifest, indent=2).encode())
+
+    _prune_old_versions(model_dir, keep=version)
+    return version
+
+
+def _prune_old_versions(model_dir: str, keep: str):
+    versions = sorted(
+        {os.path.splitext(f)[0][len("model-"):] for f in os.listdir(model_dir) if f.startswith("model-")},
+        reverse=True,
+    )
+    for stale in [v for v in versions if v != keep][KEEP_VERSIONS - 1:]:
+        for ext in (".pkl", ".npz"):
+            try:
+                os.remove(os.path.join(model_dir, f"model-{stale}{ext}"))
+            except OSError:
+                pass
+        # processes still serving a pruned version keep their mappings until they swap
+        shutil.rmtree(os.path.join(model_dir, f"model-{stale}.arrays"), ignore_errors=True)
+
+
+# ------------------------------------------------------------------ #
+# SERVING
+# ------------------------------------------------------------------ #
+class ModelRegistry:
+    """
+    Keeps the current model resident in memory and hot-swaps it when a new
+    version is published. Version checks are throttled to one `stat`/read of
+    the VERSION file per `check_interval` seconds.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, check_interval: float = 1.0, prefer_compiled: bool = True,
+                 mmap: bool = True):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self.prefer_compiled = prefer_compiled
+        self.mmap = mmap
+        self._current: Optional[LoadedModel] = None
+        self._last_check = 0.0
+        self._load_lock = threading.Lock()
+        self._listeners = []
+
+    # ---------- version discovery ----------------------------------
+    def _read_manifest(self) -> Optional[dict]:
+        version_path = os.path.join(self.model_dir, VERSION_FILE)
+        try:
+            with open(version_path) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            return None
+
+        # legacy layout: a bare model.pkl, versioned by mtime + size
+        legacy_path = os.path.join(self.model_dir, LEGACY_MODEL_FILE)
+        try:
+            st = os.stat(legacy_path)
+        except FileNotFoundError:
+            return None
+        return {"version": f"mtime-{st.st_mtime_ns}-{st.st_size}", "file": LEGACY_MODEL_FILE, "sha256": None}
+
+    # ---------- loading --------------------------------------------
+    def _read_verified(self, filename: str, sha256: Optional[str]) -> bytes:
+        try:
+            with open(os.path.join(self.model_dir, filename), "rb") as fh:
+                data = fh.read()
+        except FileNotFoundError:
+            raise ModelNotFoundError("Model file not found.")
+        if sha256 and hashlib.sha256(data).hexdigest() != sha256:
+            raise ModelLoadError(f"checksum mismatch for {filename}")
+        return data
+
+    def _load_compiled(self, manifest: dict):
+        filename = manifest["compiled"]
+        if filename.endswith(".npz"):  # published before the .arrays layout
+            data = self._read_verified(filename, manifest.get("compiled_sha256"))
+            return load_compiled(io.BytesIO(data))
+        path = os.path.join(self.model_dir, filename)
+        if not os.path.isdir(path):
+            raise ModelNotFoundError(f"{filename} not found.")
+        sha256 = manifest.get("compiled_sha256")
+        if sha256 and _dir_sha256(path) != sha256:
+            raise ModelLoadError(f"checksum mismatch for {filename}")
+        return load_compiled_dir(path, mmap=self.mmap)
+
+    def _load(self, manifest: dict) -> LoadedModel:
+        if self.prefer_compiled and manifest.get("compiled"):
+            try:
+                return LoadedModel(
+                    model=self._load_compiled(manifest),
+                    version=manifest["version"],
+                    path=os.path.join(self.model_dir, manifest["compiled"]),
+                    loaded_at=time.time(),
+                    source="compiled",
+                )
+            except Exception as e:
+                print(f"⚠️ Compiled model unusable, falling back to pickle: {e}")
+
+        import joblib  # only the pickle fallback needs it (and sklearn behind it)
+
+        data = self._read_verified(manifest["file"], manifest.get("sha256"))
+        try:
+            model = joblib.load(io.BytesIO(data))
+        except Exception as e:
+            raise ModelLoadError(str(e))
+        path = os.path.join(self.model_dir, manifest["file"])
+        return LoadedModel(model=model, version=manifest["version"], path=path, loaded_at=time.time())
+
+    def reload(self, force: bool = False) -> Optional[LoadedModel]:
+        """Load the published version if it differs from the resident one."""
+        with self._load_lock:
+            self._last_check = time.monotonic()
+            manifest = self._read_manifest()
+            if manifest is None:
+                if self._current is None:
+                    raise ModelNotFoundError("Model file not found.")
+                return self._current
+            if not force and self._current is not None and self._current.version == manifest["version"]:
+                return self._current
+
+            started = time.perf_counter()
+            loaded = self._load(manifest)
+            MODEL_LOAD_SECONDS.observe(time.perf_counter() - started, loaded.source)
+            previous, self._current = self._current, loaded
+
+        if previous is None or previous.version != loaded.version:
+            for callback in self._listeners:
+                callback(loaded)
+        return loaded
+
+    def load(self, version: str) -> LoadedModel:
+        """Load one specific published version without making it the resident model."""
+        manifest = self._read_manifest()
+        if manifest is None or manifest["version"] != version:
+            # superseded versions are found by name; their checksums left with the old VERSION file
+            manifest = {"version": version, "file": f"model-{version}.pkl", "sha256": None}
+            for ext in (".arrays", ".npz"):
+                if os.path.exists(os.path.join(self.model_dir, f"model-{version}{ext}")):
+                    manifest["compiled"] = f"model-{version}{ext}"
+                    break
+        started = time.perf_counter()
+        loaded = self._load(manifest)
+        MODEL_LOAD_SECONDS.observe(time.perf_counter() - started, loaded.source)
+        return loaded
+
+    def current(self) -> LoadedModel:
+        """Return the resident model, picking up a newly published version if one exists."""
+        loaded = self._current
+        if loaded is None:
+            return self.reload()
+
+        # only one request pays for the check; everyone else keeps serving the resident model
+        if time.monotonic() - self._last_check >= self.check_interval and not self._load_lock.locked():
+            try:
+                return self.reload()
+            except (ModelNotFoundError, ModelLoadError) as e:
+                print(f"⚠️ Keeping model {loaded.version}: {e}")
+        return loaded
+
+    def on_reload(self, callback):
+        """Register `callback(LoadedModel)` to run whenever a new version becomes resident."""
+        self._listeners.append(callback)
+        return callback
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._current.version if self._current else None
+
+
+registry = ModelRegistry(
+    check_interval=float(os.getenv("MODEL_CHECK_INTERVAL", "1.0")),
+    prefer_compiled=os.getenv("SERVE_COMPILED", "1") == "1",
+    mmap=os.getenv("MODEL_MMAP", "1") == "1",
+)
@@ -8,11 +8,15 @@ from app.database import Base
 from sqlalchemy import Column, Integer, Float
 from app.database import Base
 
-from sqlalchemy import Column, Integer, Float
+from sqlalchemy import Column, Integer, Float, String, Index
 from app.database import Base
 
+CONTENT_HASH_INDEX = "ux_feedback_content_hash"
+
 class Feedback(Base):
     __tablename__ = "feedback"
+    # one row per distinct (features, label); see app/feedback_store.content_hash
+    __table_args__ = (Index(CONTENT_HASH_INDEX, "content_hash", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     age = Column(Integer)
@@ -29,3 +33,4 @@ class Feedback(Base):
     ca = Column(Integer)
     thal = Column(Integer)
     prediction = Column(Integer)
+    content_hash = Column(String(64))  # NULL only on rows stored before hashing
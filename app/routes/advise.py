@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from backend.app.auth import get_current_user
-from backend.app.llm_advice import get_llm_advice
+from app.auth import get_current_user
+from app.llm_advice import advice_service
 
 router = APIRouter()
 
@@ -10,6 +10,12 @@ class AdviceRequest(BaseModel):
     patient_data: dict
 
 @router.post("/advise")
-def advise(data: AdviceRequest, user: str = Depends(get_current_user)):
-    advice = get_llm_advice(data.prediction, data.patient_data)
-    return {"advice": advice}
+async def advise(data: AdviceRequest, user: str = Depends(get_current_user)):
+    # 💡 async so a slow LLM call waits on the event loop instead of holding a threadpool worker
+    result = await advice_service.get_advice(data.prediction, data.patient_data)
+    return {"advice": result["advice"], "source": result["source"]}
+
+@router.get("/advise/stats")
+def advise_stats(user: str = Depends(get_current_user)):
+    # 📊 Backend calls, coalesced requests, timeouts and cache counters
+    return advice_service.stats()
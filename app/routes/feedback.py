@@ -1,38 +1,76 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.schemas import FeedbackInput
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import ValidationError
+from app.schemas import FeedbackInput, FeedbackBatchInput
 from app.auth import get_current_user
-from app.models import Feedback
-from app.dependencies import get_db
-from app.database import SessionLocal
+from app.feedback_store import feedback_row, insert_feedback
+from app.feedback_writer import feedback_writer, FeedbackQueueFullError
+from app.tracing import span, traced_handler
+import os
 
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+MAX_BULK_SIZE = int(os.getenv("FEEDBACK_MAX_BULK_SIZE", "5000"))
+
+
 @router.post("/feedback")
-def submit_feedback(input_data: FeedbackInput, db: Session = Depends(get_db), user: str = Depends(get_current_user)):
-    feedback = Feedback(
-        age=input_data.age,
-        sex=input_data.sex,
-        cp=input_data.cp,
-        trestbps=input_data.trestbps,
-        chol=input_data.chol,
-        fbs=input_data.fbs,
-        restecg=input_data.restecg,
-        thalch=input_data.thalch,
-        exang=input_data.exang,
-        oldpeak=input_data.oldpeak,
-        slope=input_data.slope,
-        ca=input_data.ca,
-        thal=input_data.thal,
-        prediction = input_data.prediction
-        
-    )
-    db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
-    return {"msg": "✅ Feedback stored", "id": feedback.id,"prediction": feedback.prediction, "user": user}
+@traced_handler
+def submit_feedback(input_data: FeedbackInput, user: str = Depends(get_current_user)):
+    if feedback_writer is not None:
+        # 📝 Write-behind: acknowledged once logged, stored by the next background flush
+        try:
+            with span("queue"):
+                feedback_writer.submit(feedback_row(input_data))
+        except FeedbackQueueFullError as e:
+            raise HTTPException(status_code=503, detail=f"Feedback queue is full: {e}")
+        return {"msg": "✅ Feedback queued", "id": None, "prediction": input_data.prediction, "user": user}
+
+    # 💾 Duplicate (features, label) pairs are skipped by the content-hash index
+    with span("insert"):
+        feedback_id, = insert_feedback([feedback_row(input_data)], path="single")
+    if feedback_id is None:
+        return {"msg": "♻️ Duplicate feedback ignored", "id": None, "duplicate": True,
+                "prediction": input_data.prediction, "user": user}
+    return {"msg": "✅ Feedback stored", "id": feedback_id, "prediction": input_data.prediction, "user": user}
+
+
+@router.post("/feedback/bulk")
+@traced_handler
+def submit_feedback_bulk(batch: FeedbackBatchInput, user: str = Depends(get_current_user)):
+    if len(batch.rows) > MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload of {len(batch.rows)} rows exceeds the limit of {MAX_BULK_SIZE}.",
+        )
+
+    # ✅ Validate each row on its own so one bad row doesn't sink the upload
+    valid, results = [], [None] * len(batch.rows)
+    for i, row in enumerate(batch.rows):
+        try:
+            valid.append((i, FeedbackInput(**row)))
+        except ValidationError as e:
+            results[i] = {"index": i, "errors": e.errors(include_url=False, include_context=False)}
+
+    # 💾 One transaction and one executemany for all valid rows; duplicates come back as None
+    with span("insert"):
+        ids = insert_feedback((feedback_row(row) for _, row in valid), path="bulk")
+    for (i, _), feedback_id in zip(valid, ids):
+        results[i] = {"index": i, "id": feedback_id, "duplicate": feedback_id is None}
+    stored = [feedback_id for feedback_id in ids if feedback_id is not None]
+
+    return {
+        "msg": f"✅ {len(stored)} feedback rows stored",
+        "first_id": stored[0] if stored else None,
+        "last_id": stored[-1] if stored else None,
+        "results": results,
+        "count": len(results),
+        "valid": len(valid),
+        "invalid": len(results) - len(valid),
+        "duplicates": len(ids) - len(stored),
+        "user": user,
+    }
+
+
+@router.get("/feedback/stats")
+def feedback_stats(user: str = Depends(get_current_user)):
+    # 📊 Write-behind queue depth and flush latency
+    return {"write_behind": feedback_writer.stats() if feedback_writer is not None else None}
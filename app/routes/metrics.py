@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metrics import metrics, StatsCollector
+from app.model_registry import registry
+from app.cache import prediction_cache
+from app.batching import batcher
+from app.inference_pool import inference_pool
+from app.auth import token_cache
+from app.llm_advice import advice_service
+from app.feedback_writer import feedback_writer
+
+router = APIRouter()
+
+CACHE_FIELDS = ("size", "hits", "misses", "hit_rate", "evictions", "expirations", "invalidations")
+
+# 📊 read at scrape time from the components' own counters
+if prediction_cache is not None:
+    metrics.register(StatsCollector("prediction_cache", "Prediction cache", prediction_cache.stats, CACHE_FIELDS))
+if token_cache is not None:
+    metrics.register(StatsCollector("token_cache", "Verified-token cache", token_cache.stats, CACHE_FIELDS))
+if advice_service.cache is not None:
+    metrics.register(StatsCollector("advice_cache", "Advice cache", advice_service.cache.stats, CACHE_FIELDS))
+metrics.register(StatsCollector("advice", "Advice service", advice_service.stats,
+                                ("requests", "backend_calls", "coalesced", "timeouts", "errors", "in_flight")))
+if batcher is not None:
+    metrics.register(StatsCollector("microbatch", "Micro-batcher", batcher.stats,
+                                    ("queue_depth", "batches", "rows", "avg_batch_size", "largest_batch", "window_ms")))
+if inference_pool is not None:
+    metrics.register(StatsCollector("inference_pool", "Process-pool inference executor", inference_pool.stats,
+                                    ("workers", "slots", "free_slots", "calls", "rows", "rejected", "restarts")))
+if feedback_writer is not None:
+    metrics.register(StatsCollector("feedback_writer", "Write-behind feedback queue", feedback_writer.stats,
+                                    ("queue_depth", "enqueued", "flushed", "duplicates", "flushes",
+                                     "failed_flushes", "last_flush_ms", "pending_log_segments")))
+
+
+class ModelInfo:
+    def render(self):
+        yield "# HELP model_info Currently served model version"
+        yield "# TYPE model_info gauge"
+        if registry.version is not None:
+            yield f'model_info{{version="{registry.version}"}} 1'
+
+
+metrics.register(ModelInfo())
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # 📈 Prometheus text exposition format; unauthenticated so scrapers don't need a token
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
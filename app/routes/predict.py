@@ -1,55 +1,246 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from app.auth import get_current_user
-from app.schemas import HeartInput
+from app.schemas import HeartInput, HeartBatchInput, HEART_FEATURES
+from app.model_registry import registry, ModelNotFoundError, ModelLoadError
+from app.batching import batcher
+from app.inference_pool import inference_pool, InferencePoolBusyError
+from app.inference import score, explain as explain_rows, UnsupportedModelError
+from app.cache import PredictionCache, prediction_cache
+from app.llm_advice import advice_service
+from app.metrics import INFERENCE_SECONDS, INFERENCE_ROWS
+from app.log import SampledLogger
+from app.tracing import span, traced_handler
 import numpy as np
-import joblib
+import asyncio
+import json
 import os
 
 router = APIRouter()
 
-@router.post("/predict")
-def predict(input_data: HeartInput, user: str = Depends(get_current_user)):
-    model_path = "models/model.pkl"
+MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "1000"))
+prediction_log = SampledLogger("predict", float(os.getenv("PREDICT_LOG_SAMPLE_RATE", "0.01")))
+
+if prediction_cache is not None:
+    # ♻️ cached results belong to the model that produced them
+    registry.on_reload(lambda loaded: prediction_cache.clear())
+
 
-    # 🔍 Check model exists
-    if not os.path.exists(model_path):
+def get_loaded_model():
+    # 🔄 Resident model (hot-reloaded by the registry when a new version is published)
+    try:
+        with span("model"):
+            loaded = registry.current()
+            # ⚙️ INFERENCE_EXECUTOR=process: score in worker processes instead of this one
+            return inference_pool.bind(loaded) if inference_pool is not None else loaded
+    except ModelNotFoundError:
         raise HTTPException(status_code=500, detail="Model file not found.")
+    except ModelLoadError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load model: {e}")
+
 
-    # 🔄 Load model
+def to_feature_matrix(inputs) -> np.ndarray:
+    """Stack validated inputs into one C-contiguous (n, 13) float64 matrix in training column order."""
+    return np.array(
+        [[getattr(row, name) for name in HEART_FEATURES] for row in inputs],
+        dtype=np.float64,
+    ).reshape(len(inputs), len(HEART_FEATURES))
+
+
+def label(predicted_class: int) -> str:
+    return "💔 Heart Disease" if predicted_class == 1 else "❤️ No Heart Disease"
+
+
+def explanations(loaded, features: np.ndarray) -> list:
+    """One explanation dict per row of `features`, from a single vectorized call."""
     try:
-        model = joblib.load(model_path)
+        with span("explain"), INFERENCE_SECONDS.time("explain"):
+            contributions, base, units, method = explain_rows(loaded.model, features)
+    except UnsupportedModelError as e:
+        raise HTTPException(status_code=501, detail=f"Explanations are not available for this model: {e}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to load model: {e}")
+        raise HTTPException(status_code=500, detail=f"Model explanation failed: {e}")
+
+    # 🩺 the features that pushed each patient's score most, either way
+    top = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :3]
+    return [
+        {
+            "units": units,
+            "method": method,
+            "base_value": b,
+            "contributions": dict(zip(HEART_FEATURES, row)),
+            "top_features": [HEART_FEATURES[j] for j in top_row],
+        }
+        for row, b, top_row in zip(contributions.tolist(), base.tolist(), top.tolist())
+    ]
+
+
+def predict_one(loaded, input_data: HeartInput):
+    """(class, probability) for one row, from the cache or the model."""
+    # ♻️ Repeated inputs skip feature construction and inference entirely
+    with span("cache"):
+        cache_key = PredictionCache.key(loaded.version, input_data)
+        cached = prediction_cache.get(cache_key) if prediction_cache is not None else None
+    if cached is not None:
+        return cached
 
     # 🔢 Convert input to NumPy array
-    features = np.array([[
-        input_data.age,
-        input_data.sex,
-        input_data.cp,
-        input_data.trestbps,
-        input_data.chol,
-        input_data.fbs,
-        input_data.restecg,
-        input_data.thalch,
-        input_data.exang,
-        input_data.oldpeak,
-        input_data.slope,
-        input_data.ca,
-        input_data.thal,
-    ]])
-
-    # 🤖 Predict
+    with span("features"):
+        features = to_feature_matrix([input_data])
+
+    # 🤖 Predict (merged with concurrent requests into one model call when micro-batching is on)
     try:
-        prediction = int(model.predict(features)[0])
+        with span("inference"):
+            if batcher is not None:
+                result = batcher.predict(loaded.model, features)
+            else:
+                with INFERENCE_SECONDS.time("single"):
+                    classes, proba = score(loaded.model, features)
+                result = (int(classes[0]), float(proba[0]))
+    except InferencePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Model prediction failed: {e}")
+    if prediction_cache is not None:
+        prediction_cache.put(cache_key, result)
+    return result
+
 
-    # 🧾 Logging (optional for debugging)
-    print(f"🧠 User: {user} | Input: {features.tolist()} | Prediction: {prediction}")
+@router.post("/predict")
+@traced_handler
+def predict(input_data: HeartInput, user: str = Depends(get_current_user),
+            explain: bool = Query(False, description="include per-feature contributions")):
+    loaded = get_loaded_model()
+    prediction, probability = predict_one(loaded, input_data)
+
+    # 🧾 Sampled structured log (PREDICT_LOG_SAMPLE_RATE) instead of a print per request
+    prediction_log.event("prediction", user=user, model_version=loaded.version,
+                         predicted_class=prediction, probability=probability)
 
     # 📦 Return formatted response
-    return {
-        "prediction": "💔 Heart Disease" if prediction == 1 else "❤️ No Heart Disease",
+    response = {
+        "prediction": label(prediction),
         "predicted_class": prediction,
         "user": user
     }
+    if explain:
+        response["explanation"] = explanations(loaded, to_feature_matrix([input_data]))[0]
+    return response
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/predict/advise")
+@traced_handler
+async def predict_and_advise(input_data: HeartInput, user: str = Depends(get_current_user)):
+    # a reload or pool start reads files / spawns processes, so keep it off the event loop
+    loaded = await run_in_threadpool(get_loaded_model)
+    with span("predict"):
+        prediction, probability = await run_in_threadpool(predict_one, loaded, input_data)
+
+    # 💡 Advice generation starts now, while the prediction is already on its way to the client
+    advice = asyncio.ensure_future(advice_service.get_advice(str(prediction), input_data.model_dump()))
+
+    async def events():
+        yield sse("prediction", {
+            "prediction": label(prediction),
+            "predicted_class": prediction,
+            "probability": probability,
+            "user": user,
+        })
+        yield sse("advice", await advice)
+        yield sse("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def batch_result(index: int, predicted_class: int, probability: float) -> dict:
+    return {
+        "index": index,
+        "prediction": label(predicted_class),
+        "predicted_class": predicted_class,
+        "probability": probability,
+    }
+
+
+@router.post("/predict/batch")
+@traced_handler
+def predict_batch(batch: HeartBatchInput, user: str = Depends(get_current_user),
+                  explain: bool = Query(False, description="include per-feature contributions for every row")):
+    if len(batch.rows) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(batch.rows)} rows exceeds the limit of {MAX_BATCH_SIZE}.",
+        )
+
+    # ✅ Validate each row on its own so one bad row doesn't sink the batch
+    valid, results = [], [None] * len(batch.rows)
+    for i, row in enumerate(batch.rows):
+        try:
+            valid.append((i, HeartInput(**row)))
+        except ValidationError as e:
+            results[i] = {"index": i, "errors": e.errors(include_url=False, include_context=False)}
+
+    if valid:
+        loaded = get_loaded_model()
+
+        # ♻️ Serve repeated rows from the cache; only misses reach the model
+        misses = []
+        with span("cache"):
+            for i, row in valid:
+                key = PredictionCache.key(loaded.version, row)
+                cached = prediction_cache.get(key) if prediction_cache is not None else None
+                if cached is not None:
+                    results[i] = batch_result(i, *cached)
+                else:
+                    misses.append((i, row, key))
+
+        if misses:
+            with span("features"):
+                features = to_feature_matrix([row for _, row, _ in misses])
+
+            # 🤖 One vectorized call for the whole batch
+            try:
+                with span("inference"), INFERENCE_SECONDS.time("batch"):
+                    classes, proba = score(loaded.model, features)
+                INFERENCE_ROWS.observe(len(misses), "batch")
+            except InferencePoolBusyError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Model prediction failed: {e}")
+
+            for (i, _, key), predicted_class, p in zip(misses, classes.tolist(), proba.tolist()):
+                if prediction_cache is not None:
+                    prediction_cache.put(key, (int(predicted_class), p))
+                results[i] = batch_result(i, int(predicted_class), p)
+
+        # 🩺 Explanations for every valid row (cached or not) in one call
+        if explain:
+            features = to_feature_matrix([row for _, row in valid])
+            for (i, _), explanation in zip(valid, explanations(loaded, features)):
+                results[i]["explanation"] = explanation
+
+    # 📦 Everything here is already JSON-native; skip jsonable_encoder's per-value walk
+    return JSONResponse({
+        "results": results,
+        "count": len(results),
+        "valid": len(valid),
+        "invalid": len(results) - len(valid),
+        "user": user,
+    })
+
+
+@router.get("/predict/stats")
+def predict_stats(user: str = Depends(get_current_user)):
+    # 📊 Micro-batching queue depth, batch-size distribution and cache counters
+    return {
+        "model_version": registry.version,
+        "microbatching": batcher.stats() if batcher is not None else None,
+        "inference_pool": inference_pool.stats() if inference_pool is not None else None,
+        "cache": prediction_cache.stats() if prediction_cache is not None else None,
+    }
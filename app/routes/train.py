@@ -1,10 +1,30 @@
-from fastapi import APIRouter
-import subprocess
-from fastapi import APIRouter, Depends
-from app.auth import get_current_user 
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.auth import get_current_user
+from app.jobs import job_manager, JobQueueFullError, MODE_ARGS
+
 router = APIRouter()
 
-@router.post("/retrain")
-def retrain(user: str = Depends(get_current_user)):
-    subprocess.run(["python", "train_model.py"])
-    return {"message": "Model retrained and saved."}
\ No newline at end of file
+@router.post("/retrain", status_code=202)
+def retrain(mode: str = Query("full", description="full | incremental"), user: str = Depends(get_current_user)):
+    # 🧵 Training runs in a background job; poll /retrain/{job_id} for progress
+    if mode not in MODE_ARGS:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {sorted(MODE_ARGS)}")
+    try:
+        job = job_manager.submit(user, mode)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"message": "Retrain job queued.", "job_id": job.id, "status": job.status}
+
+@router.get("/retrain/{job_id}")
+def retrain_status(job_id: str, user: str = Depends(get_current_user)):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+@router.post("/retrain/{job_id}/cancel")
+def cancel_retrain(job_id: str, user: str = Depends(get_current_user)):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
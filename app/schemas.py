@@ -1,8 +1,13 @@
 from pydantic import BaseModel
 # app/schemas.py
 
+from typing import Any, Dict, List
 from pydantic import BaseModel
 
+# column order the models are trained on
+HEART_FEATURES = ["age", "sex", "cp", "trestbps", "chol", "fbs", "restecg",
+                  "thalch", "exang", "oldpeak", "slope", "ca", "thal"]
+
 class HeartInput(BaseModel):
     age: int
     sex: int
@@ -33,6 +38,14 @@ class FeedbackInput(BaseModel):
     ca: int
     thal: int
     prediction: int
+
+class HeartBatchInput(BaseModel):
+    # rows are validated one by one so a bad row doesn't reject the whole batch
+    rows: List[Dict[str, Any]]
+
+class FeedbackBatchInput(BaseModel):
+    rows: List[Dict[str, Any]]
+
 class User(BaseModel):
     username: str
     password: str
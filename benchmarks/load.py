@@ -0,0 +1,133 @@
+# benchmarks/load.py
+#
+# Load generator shared by the in-process (ASGI) and uvicorn runs: request
+# builders per endpoint, a fixed-concurrency driver and latency summaries.
+
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from app.schemas import HEART_FEATURES
+
+# value ranges roughly matching heart.csv after encoding
+FEATURE_RANGES = {
+    "age": (29, 77), "sex": (0, 1), "cp": (0, 3), "trestbps": (94, 200), "chol": (126, 564),
+    "fbs": (0, 1), "restecg": (0, 2), "thalch": (71, 202), "exang": (0, 1), "oldpeak": (0, 6.2),
+    "slope": (0, 2), "ca": (0, 3), "thal": (0, 2),
+}
+BATCH_ROWS = 100
+
+
+def random_patient(rng: random.Random) -> dict:
+    row = {}
+    for name in HEART_FEATURES:
+        low, high = FEATURE_RANGES[name]
+        row[name] = round(rng.uniform(low, high), 1) if name == "oldpeak" else rng.randint(low, high)
+    return row
+
+
+class Payloads:
+    """A fixed pool of `distinct` patients, so cache hit rates are repeatable between runs."""
+
+    def __init__(self, distinct: int = 1000, seed: int = 44):
+        self.rng = random.Random(seed)
+        self.pool = [random_patient(self.rng) for _ in range(distinct)]
+        self.feedback_counter = 0
+
+    def patient(self) -> dict:
+        return self.rng.choice(self.pool)
+
+    def feedback(self) -> dict:
+        # fresh rows, so the content-hash index doesn't turn the run into duplicate rejections
+        self.feedback_counter += 1
+        return dict(random_patient(self.rng), prediction=self.feedback_counter % 2)
+
+
+# endpoint name -> (method, path, request kwargs builder); builders get (payloads, auth headers)
+ENDPOINTS = {
+    "login": ("POST", "/login", lambda p, h: {"data": {"username": "admin", "password": "password123"}}),
+    "predict": ("POST", "/predict", lambda p, h: {"json": p.patient(), "headers": h}),
+    "predict_batch": ("POST", "/predict/batch",
+                      lambda p, h: {"json": {"rows": [p.patient() for _ in range(BATCH_ROWS)]}, "headers": h}),
+    # same requests with per-feature contributions, to measure what explanations add
+    "predict_explain": ("POST", "/predict",
+                        lambda p, h: {"json": p.patient(), "params": {"explain": "true"}, "headers": h}),
+    "predict_batch_explain": ("POST", "/predict/batch",
+                              lambda p, h: {"json": {"rows": [p.patient() for _ in range(BATCH_ROWS)]},
+                                            "params": {"explain": "true"}, "headers": h}),
+    "feedback": ("POST", "/feedback", lambda p, h: {"json": p.feedback(), "headers": h}),
+    "advise": ("POST", "/advise",
+               lambda p, h: {"json": {"prediction": str(p.rng.randint(0, 1)), "patient_data": p.patient()},
+                             "headers": h}),
+}
+# endpoints whose latency depends on the served model
+MODEL_ENDPOINTS = ("predict", "predict_batch", "predict_explain", "predict_batch_explain")
+
+
+async def drive(client, endpoint: str, payloads: Payloads, headers: dict,
+                requests: int, concurrency: int, warmup: int = 0) -> dict:
+    """Send `requests` calls from `concurrency` concurrent workers and summarize them."""
+    method, path, build = ENDPOINTS[endpoint]
+    for _ in range(warmup):
+        await client.request(method, path, **build(payloads, headers))
+
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            kwargs = build(payloads, headers)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    ms = np.asarray(latencies, dtype=float) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": len(ms) / elapsed if elapsed else 0.0,
+        "mean_ms": float(ms.mean()) if len(ms) else 0.0,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()) if len(ms) else 0.0,
+    }
+
+
+def compare(results: list, baseline: list, max_regression: float) -> list:
+    """
+    Regressions of `results` against `baseline` (both lists of result
+    records), matched on (transport, model, endpoint): p95 slower, or
+    throughput lower, by more than `max_regression` (a fraction).
+    """
+    base = {(r["transport"], r["model"], r["endpoint"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r["transport"], r["model"], r["endpoint"]))
+        if b is None:
+            continue
+        if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{r['model']}/{r['endpoint']}: p95 {b['p95_ms']:.2f} -> {r['p95_ms']:.2f} ms")
+        if b["throughput_rps"] and r["throughput_rps"] < b["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{r['model']}/{r['endpoint']}: throughput "
+                               f"{b['throughput_rps']:.1f} -> {r['throughput_rps']:.1f} req/s")
+        if r["errors"] > b["errors"]:
+            regressions.append(f"{r['model']}/{r['endpoint']}: errors {b['errors']} -> {r['errors']}")
+    return regressions
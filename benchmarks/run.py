@@ -0,0 +1,247 @@
+# benchmarks/run.py
+#
+# Load test for the API, in-process over ASGI or against a local uvicorn:
+#
+#   python -m benchmarks.run --transport asgi --models lr,rf,xgb --concurrency 16
+#   python -m benchmarks.run --transport uvicorn --baseline benchmarks/results/base.json
+#
+# Each model type is trained on heart.csv with fixed hyper-parameters and
+# published to its own model directory; model-independent endpoints are run
+# once. Results go to a JSON file; with --baseline the run fails (exit 1) if
+# any (model, endpoint) regresses by more than --max-regression.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load import ENDPOINTS, MODEL_ENDPOINTS, Payloads, compare, drive
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+MODEL_KINDS = ("lr", "rf", "xgb")
+
+
+def make_estimator(kind: str):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    if kind == "lr":
+        return Pipeline([("scale", StandardScaler()), ("clf", LogisticRegression(max_iter=1000))])
+    if kind == "rf":
+        return Pipeline([("scale", StandardScaler()),
+                         ("clf", RandomForestClassifier(n_estimators=200, random_state=44, n_jobs=1))])
+    if kind == "xgb":
+        return XGBClassifier(n_estimators=200, max_depth=4, learning_rate=0.1, random_state=44, n_jobs=1)
+    raise ValueError(f"unknown model kind {kind!r}")
+
+
+def model_dirs_for(kinds, root: str) -> dict:
+    return {kind: os.path.join(root, f"models-{kind}") for kind in kinds}
+
+
+def build_models(model_dirs: dict):
+    """Fit and publish one model per kind into {kind: model_dir}."""
+    from app.inference import compile_model
+    from app.model_registry import publish_model
+    from app.schemas import HEART_FEATURES
+    from ml.train_model import load_clean_csv
+
+    df = load_clean_csv().dropna(subset=["target"])
+    X = df[HEART_FEATURES].fillna(df[HEART_FEATURES].median()).to_numpy(dtype=float)
+    y = (df["target"] > 0).astype(int).to_numpy()
+
+    for kind, model_dir in model_dirs.items():
+        estimator = make_estimator(kind).fit(X, y)
+        publish_model(estimator, model_dir=model_dir, compiled=compile_model(estimator))
+        print(f"📦 Published benchmark {kind} model to {model_dir}")
+
+
+async def login(client) -> dict:
+    response = await client.post("/login", data={"username": "admin", "password": "password123"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_suite(client, kind: str, endpoints, args, transport: str, shared: bool) -> list:
+    headers = await login(client)
+    payloads = Payloads(distinct=args.distinct)
+    records = []
+    for endpoint in endpoints:
+        per_model = endpoint in MODEL_ENDPOINTS
+        if not per_model and not shared:
+            continue
+        summary = await drive(client, endpoint, payloads, headers, args.requests, args.concurrency, args.warmup)
+        record = {"model": kind if per_model else "-", "endpoint": endpoint, "transport": transport, **summary}
+        records.append(record)
+    return records
+
+
+def print_records(records):
+    for r in records:
+        print(f"  {r['model']:>7} {r['endpoint']:<22} {r['throughput_rps']:9.1f} req/s  "
+              f"p50 {r['p50_ms']:7.2f}  p95 {r['p95_ms']:7.2f}  p99 {r['p99_ms']:7.2f} ms  errors {r['errors']}")
+
+
+async def run_asgi(model_dirs: dict, endpoints, args) -> list:
+    from app.main import app
+    from app.model_registry import registry
+
+    records = []
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport doesn't send lifespan events; run startup (DB setup, warm-up) explicitly
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i, (kind, model_dir) in enumerate(model_dirs.items()):
+            registry.model_dir = model_dir
+            registry.reload(force=True)
+            # keep app-side prints out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                suite = await run_suite(client, kind, endpoints, args, "asgi", shared=i == 0)
+            print_records(suite)
+            records += suite
+    return records
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def uvicorn_server(model_dir: str, workers: int):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=PROJECT_ROOT, env=dict(os.environ, MODEL_DIR=model_dir), stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if httpx.get(f"{base_url}/ready").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not come up")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def run_uvicorn(model_dirs: dict, endpoints, args) -> list:
+    records = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    for i, (kind, model_dir) in enumerate(model_dirs.items()):
+        with uvicorn_server(model_dir, args.workers) as base_url:
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+                suite = await run_suite(client, kind, endpoints, args, "uvicorn", shared=i == 0)
+        print_records(suite)
+        records += suite
+    return records
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the heartwatch API under concurrent load.")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--models", default=",".join(MODEL_KINDS),
+                        help="comma-separated model kinds (lr, rf, xgb) or 'current' for MODEL_DIR as published")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--distinct", type=int, default=1000, help="size of the patient payload pool")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--executor", choices=("thread", "process"), default=os.getenv("INFERENCE_EXECUTOR", "thread"),
+                        help="score in the request thread or in a worker-process pool (INFERENCE_EXECUTOR)")
+    parser.add_argument("--advice-delay-ms", type=float, default=0.0, help="simulated LLM latency for /advise")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<transport>-<time>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    # scratch database, stub LLM and model dir; set before any app module is imported
+    # (the registry and inference pool read MODEL_DIR at import), or uvicorn started
+    workdir = tempfile.mkdtemp(prefix="heartwatch-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'feedback.db')}"
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ["ADVICE_BACKEND"] = "template"
+    os.environ["ADVICE_TEMPLATE_DELAY_MS"] = str(args.advice_delay_ms)
+    os.environ["INFERENCE_EXECUTOR"] = args.executor
+    os.environ.setdefault("FEEDBACK_WRITE_LOG", os.path.join(workdir, "feedback-writebehind.log"))
+
+    if args.models == "current":
+        model_dirs = {"current": os.path.abspath(os.getenv("MODEL_DIR", "models"))}
+    else:
+        model_dirs = model_dirs_for([k.strip() for k in args.models.split(",") if k.strip()], workdir)
+    os.environ["MODEL_DIR"] = next(iter(model_dirs.values()))
+    if args.models != "current":
+        build_models(model_dirs)
+
+    print(f"🏁 {args.transport}: {args.requests} requests x {len(endpoints)} endpoints, "
+          f"concurrency {args.concurrency}")
+    runner = run_asgi if args.transport == "asgi" else run_uvicorn
+    records = asyncio.run(runner(model_dirs, endpoints, args))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": records,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.transport}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(records, json.load(fh)["results"], args.max_regression)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions beyond {args.max_regression:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ No regressions beyond {args.max_regression:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
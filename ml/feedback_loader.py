@@ -0,0 +1,78 @@
+# ml/feedback_loader.py
+#
+# Streams the feedback table straight from a DB cursor into typed NumPy
+# columns, one bounded chunk at a time, without building ORM objects.
+# Reads go through the read-only engine so training never holds up writers.
+
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from app.database import read_engine as default_engine
+from app.schemas import HEART_FEATURES
+
+# features are float64 so NULLs come through as NaN; rows without a label are skipped
+FEEDBACK_DTYPE = np.dtype(
+    [("id", np.int64)] + [(name, np.float64) for name in HEART_FEATURES] + [("prediction", np.int64)]
+)
+DEFAULT_CHUNK_SIZE = 10_000
+
+_COLUMNS = ", ".join(FEEDBACK_DTYPE.names)
+
+
+def _where(min_id: Optional[int], max_id: Optional[int]):
+    clauses, params = ["prediction IS NOT NULL"], {}
+    if min_id is not None:
+        clauses.append("id > :min_id")
+        params["min_id"] = min_id
+    if max_id is not None:
+        clauses.append("id <= :max_id")
+        params["max_id"] = max_id
+    return " AND ".join(clauses), params
+
+
+def iter_feedback_chunks(min_id: Optional[int] = None, max_id: Optional[int] = None,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE, engine=None) -> Iterator[np.ndarray]:
+    """
+    Yield feedback rows with min_id < id <= max_id, in id order, as
+    structured arrays of at most `chunk_size` rows (dtype FEEDBACK_DTYPE).
+    """
+    where, params = _where(min_id, max_id)
+    query = text(f"SELECT {_COLUMNS} FROM feedback WHERE {where} ORDER BY id")
+    with (engine or default_engine).connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(query, params)
+        for rows in result.partitions(chunk_size):
+            yield np.fromiter((tuple(r) for r in rows), dtype=FEEDBACK_DTYPE, count=len(rows))
+
+
+def count_feedback(min_id: Optional[int] = None, max_id: Optional[int] = None, engine=None) -> int:
+    where, params = _where(min_id, max_id)
+    with (engine or default_engine).connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM feedback WHERE {where}"), params).scalar()
+
+
+def load_feedback_frame(min_id: Optional[int] = None, max_id: Optional[int] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE, engine=None) -> pd.DataFrame:
+    """
+    Load a feedback id range into a DataFrame with columns
+    id, <13 features>, prediction.
+
+    The result array is allocated once from a COUNT(*) and filled chunk by
+    chunk, so peak memory is the result plus one chunk.
+    """
+    if max_id is None:
+        # pin the upper bound so rows inserted while streaming can't overflow the buffer
+        where, params = _where(min_id, None)
+        with (engine or default_engine).connect() as conn:
+            max_id = conn.execute(text(f"SELECT MAX(id) FROM feedback WHERE {where}"), params).scalar()
+        if max_id is None:
+            return pd.DataFrame(np.empty(0, dtype=FEEDBACK_DTYPE))
+
+    out = np.empty(count_feedback(min_id, max_id, engine=engine), dtype=FEEDBACK_DTYPE)
+    filled = 0
+    for chunk in iter_feedback_chunks(min_id, max_id, chunk_size=chunk_size, engine=engine):
+        out[filled:filled + len(chunk)] = chunk
+        filled += len(chunk)
+    return pd.DataFrame(out[:filled])
@@ -1,111 +1,161 @@
-import os, joblib, warnings, random
+import argparse, copy, hashlib, io, json, os, shutil, tempfile, time, warnings, random
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import numpy as np
 import pandas as pd
-import mlflow
-import mlflow.sklearn
 
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import accuracy_score, roc_auc_score, f1_score, confusion_matrix
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from xgboost import XGBClassifier
+# sklearn, xgboost, imblearn and mlflow take seconds to import; they are
+# imported inside the functions that use them, so the API and tools that only
+# need the data-preparation helpers stay cheap to import.
 
-from imblearn.over_sampling import RandomOverSampler
+from sqlalchemy import text
 
-from app.database import SessionLocal
-from app.models import Feedback
+from app.database import read_engine
+from ml.feedback_loader import load_feedback_frame
+from app.model_registry import publish_model, ModelRegistry, MODEL_DIR
+from app.schemas import HEART_FEATURES as FEATURES
+from app.inference import compile_model, check_parity, UnsupportedModelError
 
 warnings.filterwarnings("ignore")
 random.seed(44)
 
 
+def report_progress(fraction: float, stage: str):
+    # parsed by app/jobs.py to report /retrain/{job_id} progress
+    print(f"[progress] {fraction:.2f} {stage}", flush=True)
+
+
 # ------------------------------------------------------------------ #
 # 1. LOAD CSV  +  SQLITE FEEDBACK  AND  CLEANING
 # ------------------------------------------------------------------ #
-def load_and_prepare_data() -> tuple:
-    """
-    Returns:
-        (X_train, X_test, y_train, y_test), FEATURES
-    """
-    # ---------- 1.1 read primary CSV --------------------------------
-    df = pd.read_csv("data/heart.csv")
-
-    # drop ID if present
-    if "id" in df.columns:
-        df.drop(columns="id", inplace=True)
-    if "dataset" in df.columns:
-        df.drop(columns="dataset", inplace=True)
-
-    # ---------- 1.2 pull feedback rows from SQLite ------------------
-    db = SessionLocal()
-    feedback_rows = db.query(Feedback).all()
-    db.close()
-
-    if feedback_rows and len(feedback_rows) >= 50:          # only if we have enough rows
-        fb_df = pd.DataFrame(
-            [{
-                "age": fb.age,  "sex": fb.sex,
-                "cp": fb.cp,    "trestbps": fb.trestbps,  "chol": fb.chol,
-                "fbs": fb.fbs,  "restecg": fb.restecg,    "thalch": fb.thalch,
-                "exang": fb.exang,  "oldpeak": fb.oldpeak,
-                "slope": fb.slope,  "ca": fb.ca,  "thal": fb.thal,
-                "target": fb.prediction
-            } for fb in feedback_rows]
-        ).drop_duplicates()
+CSV_PATH = "data/heart.csv"
+PREP_CACHE_DIR = os.getenv("PREP_CACHE_DIR", "data/.cache")
+PREP_VERSION = 1          # bump when clean_frame() changes meaning
+
+# maps *after* we coerce to str.lower()
+MAP_SEX       = {"male": 0, "female": 1}
+MAP_CP        = {"typical angina": 0, "atypical angina": 1,
+                 "non-anginal": 2,"non-anginal pain": 2,
+                 "asymptomatic": 3}
+MAP_RESTECG   = {"normal": 0,"st-t wave abnormality": 1,
+                "lv hypertrophy": 2,
+                 "left ventricular hypertrophy": 2,
+                 }
+MAP_SLOPE     = {"upsloping": 0, "flat": 1, "downsloping": 2}
+MAP_THAL      = {"normal": 0, "fixed defect": 1,
+                 "reversable defect": 2, "reversible defect": 2}
+MAP_BOOL      = {"true": 1, "false": 0}
+
+CAT_MAPPINGS = {
+    "sex": MAP_SEX,
+    "cp": MAP_CP,
+    "restecg": MAP_RESTECG,
+    "slope": MAP_SLOPE,
+    "thal": MAP_THAL,
+}
+
+PREPARED_COLUMNS = FEATURES + ["target"]
+
+
+def _encode(series: pd.Series, mapper: dict) -> pd.Series:
+    """Map string labels; values that already are valid numeric codes pass through."""
+    encoded = (
+        series
+        .astype(str)                # ensure string
+        .str.strip()                # remove spaces
+        .str.lower()                # lower‑case
+        .map(mapper)                # apply mapping
+    )
+    codes = pd.to_numeric(series, errors="coerce")
+    return encoded.fillna(codes.where(codes.isin(set(mapper.values()))))
 
-        df = pd.concat([df, fb_df], ignore_index=True)
-        print(f"✅ Integrated {len(fb_df)} feedback rows")
-    else:
-        print(f"ℹ️ Skipping feedback integration (only {len(feedback_rows)} found)")
 
-    # ---------- 1.3 tidy / rename columns ---------------------------
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """String-cleaning / encoding stage: raw rows -> numeric FEATURES + target."""
+    df = df.drop(columns=[c for c in ("id", "dataset") if c in df.columns])
+
+    # ---------- tidy / rename columns -------------------------------
     if "num" in df.columns and "target" not in df.columns:
-        df.rename(columns={"num": "target"}, inplace=True)
-
-    # ---------- 1.4 categorical mappings ----------------------------
-    # maps *after* we coerce to str.lower()
-    MAP_SEX       = {"male": 0, "female": 1}
-    MAP_CP        = {"typical angina": 0, "atypical angina": 1,
-                     "non-anginal": 2,"non-anginal pain": 2,
-                     "asymptomatic": 3}
-    MAP_RESTECG   = {"normal": 0,"st-t wave abnormality": 1,
-                    "lv hypertrophy": 2,
-                     "left ventricular hypertrophy": 2,
-                     }
-    MAP_SLOPE     = {"upsloping": 0, "flat": 1, "downsloping": 2}
-    MAP_THAL      = {"normal": 0, "fixed defect": 1,
-                     "reversable defect": 2, "reversible defect": 2}
+        df = df.rename(columns={"num": "target"})
 
     # harmonise boolean‑like strings
-    df["fbs"]  = df["fbs"].astype(str).str.lower().map({"true": 1, "false": 0}).fillna(0).astype(int)
-    df["exang"]= df["exang"].astype(str).str.lower().map({"true": 1, "false": 0}).fillna(0).astype(int)
-
-    cat_mappings = {
-        "sex": MAP_SEX,
-        "cp": MAP_CP,
-        "restecg": MAP_RESTECG,
-        "slope": MAP_SLOPE,
-        "thal": MAP_THAL,
-    }
+    df["fbs"]  = _encode(df["fbs"], MAP_BOOL).fillna(0).astype(int)
+    df["exang"]= _encode(df["exang"], MAP_BOOL).fillna(0).astype(int)
 
-    for col, mapper in cat_mappings.items():
-        df[col] = (
-            df[col]
-            .astype(str)                # ensure string
-            .str.strip()                # remove spaces
-            .str.lower()                # lower‑case
-            .map(mapper)                # apply mapping
-        )
+    for col, mapper in CAT_MAPPINGS.items():
+        df[col] = _encode(df[col], mapper)
         # fill unmapped (NaN) with column median
         median_val = df[col].median()
         df[col] = df[col].fillna(median_val).astype(int)
-    # ---------- 1.5 numeric columns / label -------------------------
-    FEATURES = ["age","sex","cp","trestbps","chol","fbs","restecg",
-                "thalch","exang","oldpeak","slope","ca","thal"]
 
+    return df[PREPARED_COLUMNS].astype(float)
+
+
+def _prep_cache_key(csv_bytes: bytes) -> str:
+    h = hashlib.sha256(csv_bytes)
+    h.update(json.dumps({"mappings": CAT_MAPPINGS, "bool": MAP_BOOL, "version": PREP_VERSION},
+                        sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+def load_clean_csv(csv_path: str = CSV_PATH) -> pd.DataFrame:
+    """
+    Cleaned, encoded CSV rows. The result is stored as one uncompressed .npy
+    per column under PREP_CACHE_DIR, keyed by the CSV content and the mapping
+    tables, and memory-mapped on later runs.
+    """
+    with open(csv_path, "rb") as fh:
+        csv_bytes = fh.read()
+    cache_dir = os.path.join(PREP_CACHE_DIR, f"heart-{_prep_cache_key(csv_bytes)}")
+
+    if os.path.isdir(cache_dir):
+        try:
+            return pd.DataFrame({
+                col: np.load(os.path.join(cache_dir, f"{col}.npy"), mmap_mode="r")
+                for col in PREPARED_COLUMNS
+            })
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable prep cache {cache_dir}: {e}")
+
+    df = clean_frame(pd.read_csv(io.BytesIO(csv_bytes)))
+
+    # write next to the final location, then rename: a half-written cache is never visible
+    os.makedirs(PREP_CACHE_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=PREP_CACHE_DIR, prefix=".tmp-")
+    for col in PREPARED_COLUMNS:
+        np.save(os.path.join(tmp_dir, f"{col}.npy"), df[col].to_numpy())
+    try:
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)     # another run won the race
+    return df
+
+
+def load_and_prepare_data(feedback_max_id=None) -> tuple:
+    """
+    Args:
+        feedback_max_id: only use feedback rows with id <= this (default: all)
+
+    Returns:
+        (X_train, X_test, y_train, y_test), FEATURES
+    """
+    # ---------- 1.1 cleaned primary CSV (cached) --------------------
+    df = load_clean_csv()
+
+    # ---------- 1.2 stream feedback rows from SQLite ----------------
+    fb_df = load_feedback_frame(max_id=feedback_max_id)
+
+    if len(fb_df) >= 50:          # only if we have enough rows
+        # only the new rows go through the string-cleaning stage; duplicates
+        # are already rejected at insert time by the content-hash index
+        fb_df = clean_frame(fb_df.drop(columns="id").rename(columns={"prediction": "target"}))
+        df = pd.concat([df, fb_df], ignore_index=True)
+        print(f"✅ Integrated {len(fb_df)} feedback rows")
+    else:
+        print(f"ℹ️ Skipping feedback integration (only {len(fb_df)} found)")
+
+    # ---------- 1.3 label / class balance ---------------------------
     df.dropna(subset=["target"], inplace=True)
     df["target"] = (df["target"] > 0).astype(int)
 
@@ -120,6 +170,8 @@ def load_and_prepare_data() -> tuple:
     X = df[FEATURES].fillna(df[FEATURES].median(numeric_only=True))
     y = df["target"]
 
+    from sklearn.model_selection import train_test_split
+
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, stratify=y, test_size=0.2, random_state=44
     )
@@ -131,90 +183,545 @@ def load_and_prepare_data() -> tuple:
 # ------------------------------------------------------------------ #
 # 2. TRAIN AND LOG MODELS
 # ------------------------------------------------------------------ #
-def train_and_log_models(X_train, X_test, y_train, y_test, feature_cols):
-    ros = RandomOverSampler(random_state=44)
-    X_train_bal, y_train_bal = ros.fit_resample(X_train, y_train)
+XGB_PARAM_DIST = {
+    "max_depth": [3, 4, 5, 6],
+    "learning_rate": [0.02, 0.05, 0.1],
+    "subsample": [0.8, 0.9, 1.0],
+    "colsample_bytree": [0.7, 0.8, 1.0],
+    "gamma": [0, 1, 5]
+}
+
+CANDIDATE_NAMES = ["RandomForest", "LogisticRegression", "XGB_Tuned"]
+
+
+def evaluate(model, X_test, y_test) -> dict:
+    """AUC / accuracy / F1 from a single predict_proba pass."""
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+    proba = model.predict_proba(X_test)
+    y_pred = np.asarray(model.classes_)[proba.argmax(axis=1)]
+    return {
+        "auc": roc_auc_score(y_test, proba[:, 1]),
+        "acc": accuracy_score(y_test, y_pred),
+        "f1": f1_score(y_test, y_pred),
+    }
 
-    mlflow.set_experiment("heart_disease_prediction")
-    best, best_name, best_auc, best_acc = None, "", 0, 0
 
-    CANDIDATES = {
-        "RandomForest": RandomForestClassifier(n_estimators=400, max_depth=None, random_state=44),
-        "LogisticRegression": LogisticRegression(max_iter=500, class_weight="balanced"),
-    }
+def _cv_folds(y) -> int:
+    min_class_count = min(Counter(y).values())
+    return min(5, min_class_count) if min_class_count >= 2 else 2
 
-    with mlflow.start_run(run_name="RF_LR_Baselines"):
-        for name, model in CANDIDATES.items():
-            pipe = Pipeline([("scale", StandardScaler()), ("clf", model)])
-            pipe.fit(X_train_bal, y_train_bal)
-            auc = roc_auc_score(y_test, pipe.predict_proba(X_test)[:, 1])
-            acc = accuracy_score(y_test, pipe.predict(X_test))
-            f1 = f1_score(y_test, pipe.predict(X_test))
-
-            mlflow.log_metric(f"{name}_auc", auc)
-            mlflow.log_metric(f"{name}_acc", acc)
-            mlflow.log_metric(f"{name}_f1", f1)
-
-            if auc > best_auc and acc > best_acc:
-                best, best_name, best_auc, best_acc = pipe, name, auc, acc
-            print(f"✔ {name}: AUC={auc:.3f}  ACC={round(acc * 100, 2)}%")
-
-    xgb_base = XGBClassifier(
-        objective="binary:logistic",
-        eval_metric="logloss",
-        n_estimators=500,
-        random_state=44
-    )
-    param_dist = {
-        "max_depth": [3, 4, 5, 6],
-        "learning_rate": [0.02, 0.05, 0.1],
-        "subsample": [0.8, 0.9, 1.0],
-        "colsample_bytree": [0.7, 0.8, 1.0],
-        "gamma": [0, 1, 5]
+
+def fit_candidate(name, X, y, n_jobs=None, search="random"):
+    """
+    Fit one candidate family. Top-level so it can run in a worker process.
+
+    Returns:
+        (name, fitted model, tuned params or None, fit seconds)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import HalvingRandomSearchCV, RandomizedSearchCV
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    started = time.perf_counter()
+    params = None
+
+    if name == "RandomForest":
+        model = Pipeline([("scale", StandardScaler()),
+                          ("clf", RandomForestClassifier(n_estimators=400, max_depth=None,
+                                                         random_state=44, n_jobs=n_jobs))])
+        model.fit(X, y)
+    elif name == "LogisticRegression":
+        model = Pipeline([("scale", StandardScaler()),
+                          ("clf", LogisticRegression(max_iter=500, class_weight="balanced"))])
+        model.fit(X, y)
+    elif name == "XGB_Tuned":
+        if search == "halving":
+            # successive halving over the number of trees: 27 configs get 20 trees,
+            # the best third 60, then 180, and the final 1 is refit with 540
+            tuner = HalvingRandomSearchCV(
+                XGBClassifier(objective="binary:logistic", eval_metric="logloss",
+                              random_state=44, n_jobs=n_jobs),
+                XGB_PARAM_DIST,
+                resource="n_estimators",
+                min_resources=20,
+                max_resources=540,
+                factor=3,
+                n_candidates="exhaust",
+                cv=_cv_folds(y),
+                scoring="roc_auc",
+                random_state=44,
+                n_jobs=1,
+            )
+        else:
+            tuner = RandomizedSearchCV(
+                XGBClassifier(objective="binary:logistic", eval_metric="logloss",
+                              n_estimators=500, random_state=44),
+                XGB_PARAM_DIST,
+                n_iter=20,
+                cv=_cv_folds(y),
+                scoring="roc_auc",
+                verbose=0,
+                random_state=44,
+                n_jobs=-1 if n_jobs is None else n_jobs
+            )
+        tuner.fit(X, y)
+        model, params = tuner.best_estimator_, tuner.best_params_
+    else:
+        raise ValueError(f"unknown candidate {name}")
+
+    return name, model, params, time.perf_counter() - started
+
+
+def split_cpu_budget(cpu_budget: int) -> dict:
+    """Share `cpu_budget` cores between the candidate families (LR is single-threaded)."""
+    rest = max(1, cpu_budget - 1)
+    rf = max(1, rest // 3)
+    return {"LogisticRegression": 1, "RandomForest": rf, "XGB_Tuned": max(1, rest - rf)}
+
+
+def fit_candidates(X, y, parallel=False, cpu_budget=None) -> dict:
+    if not parallel:
+        fitted = {}
+        for i, name in enumerate(CANDIDATE_NAMES):
+            report_progress(0.20 + 0.2 * i, f"fitting {name}")
+            fitted[name] = fit_candidate(name, X, y)
+        return fitted
+
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    n_jobs = split_cpu_budget(cpu_budget)
+    print(f"⚡ Parallel search on {cpu_budget} CPUs: {n_jobs}")
+
+    fitted = {}
+    with ProcessPoolExecutor(max_workers=min(len(CANDIDATE_NAMES), cpu_budget)) as pool:
+        futures = [pool.submit(fit_candidate, name, X, y, n_jobs[name], "halving")
+                   for name in CANDIDATE_NAMES]
+        report_progress(0.20, "fitting candidates in parallel")
+        for done, future in enumerate(as_completed(futures), start=1):
+            name, model, params, seconds = future.result()
+            fitted[name] = (name, model, params, seconds)
+            report_progress(0.20 + 0.6 * done / len(futures), f"fitted {name} in {seconds:.1f}s")
+    return fitted
+
+
+def export_and_publish(best, best_name, X_check) -> str:
+    """Compile `best`, verify the compiled form on `X_check`, publish both."""
+    try:
+        compiled = compile_model(best)
+        parity = check_parity(best, compiled, X_check)
+        if not parity["ok"]:
+            print(f"⚠️ Compiled model disagrees with {best_name} ({parity}); serving the pickle")
+            compiled = None
+        else:
+            print(f"✅ Compiled {best_name} (max |Δp| = {parity['max_abs_diff']:.2e})")
+    except UnsupportedModelError as e:
+        print(f"ℹ️ No compiled form: {e}")
+        compiled = None
+
+    version = publish_model(best, compiled=compiled)
+    print(f"✅ model published (version {version})")
+    return version
+
+
+# ------------------------------------------------------------------ #
+# 2b. SERVING COST, COMPACTION AND BUDGETED SELECTION
+# ------------------------------------------------------------------ #
+# 0 = no limit; the CLI flags override these
+MODEL_MAX_SIZE_MB = float(os.getenv("MODEL_MAX_SIZE_MB", "0"))
+MODEL_MAX_SINGLE_MS = float(os.getenv("MODEL_MAX_SINGLE_MS", "0"))
+MODEL_MAX_BATCH_MS = float(os.getenv("MODEL_MAX_BATCH_MS", "0"))
+MODEL_AUC_TOLERANCE = float(os.getenv("MODEL_AUC_TOLERANCE", "0"))
+COMPACT_TREES = [int(k) for k in os.getenv("COMPACT_TREES", "200,100,50").split(",") if k.strip()]
+COST_BATCH_ROWS = 100
+
+
+def _median_ms(fn, repeats: int) -> float:
+    fn()  # first call pays for lazy allocations
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings))
+
+
+def serving_cost(model, X_sample, repeats: int = 50) -> dict:
+    """
+    Size of the artifact the API would serve (the compiled arrays when the
+    model has a compiled form, else the pickle) and its median single-row
+    and COST_BATCH_ROWS-row predict_proba latency in ms.
+    """
+    try:
+        served = compile_model(model)
+        size = sum(a.nbytes for a in served.arrays.values())
+    except UnsupportedModelError:
+        import joblib
+
+        buf = io.BytesIO()
+        joblib.dump(model, buf)
+        served, size = model, buf.getbuffer().nbytes
+    X = np.asarray(X_sample, dtype=np.float64)
+    batch = np.resize(X, (COST_BATCH_ROWS, X.shape[1]))
+    return {
+        "size_mb": size / 1e6,
+        "single_ms": _median_ms(lambda: served.predict_proba(X[:1]), repeats),
+        "batch_ms": _median_ms(lambda: served.predict_proba(batch), max(5, repeats // 5)),
     }
 
-    min_class_count = min(Counter(y_train_bal).values())
-    cv_folds = min(5, min_class_count) if min_class_count >= 2 else 2
-
-    tuner = RandomizedSearchCV(
-        xgb_base,
-        param_dist,
-        n_iter=20,
-        cv=cv_folds,
-        scoring="roc_auc",
-        verbose=0,
-        random_state=44,
-        n_jobs=-1
-    )
 
-    tuner.fit(X_train_bal, y_train_bal)
+def compact_variants(name, model):
+    """
+    Smaller versions of a fitted candidate, as (variant name, model) pairs:
+    the first k trees of a RandomForest for each k in COMPACT_TREES. Forest
+    trees are fitted independently, so a prefix is a valid smaller forest
+    and needs no refit.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import Pipeline
+
+    clf = model.named_steps["clf"] if hasattr(model, "named_steps") else model
+    if not isinstance(clf, RandomForestClassifier):
+        return
+    for k in sorted(COMPACT_TREES, reverse=True):
+        if k >= len(clf.estimators_):
+            continue
+        small = copy.copy(clf)
+        small.estimators_ = clf.estimators_[:k]
+        small.n_estimators = k
+        if hasattr(model, "named_steps"):
+            small = Pipeline(model.steps[:-1] + [("clf", small)])
+        yield f"{name}_{k}trees", small
 
-    xgb_best = tuner.best_estimator_
-    auc = roc_auc_score(y_test, xgb_best.predict_proba(X_test)[:, 1])
-    acc = accuracy_score(y_test, xgb_best.predict(X_test))
-    f1 = f1_score(y_test, xgb_best.predict(X_test))
 
-    with mlflow.start_run(run_name="XGB_Tuned"):
-        mlflow.log_params(tuner.best_params_)
-        mlflow.log_metrics({"auc": auc, "accuracy": acc, "f1": f1})
+def budget_violations(cost: dict, budget: dict) -> list:
+    """Which limits of `budget` ({size_mb, single_ms, batch_ms}; 0 = none) `cost` exceeds."""
+    return [key for key, limit in budget.items() if limit and cost[key] > limit]
 
-    if auc > best_auc and acc > best_acc:
-        best, best_name, best_auc, best_acc = xgb_best, "XGB_Tuned", auc, acc
 
-    print(confusion_matrix(y_test, best.predict(X_test)))
-    print(f"🏆 Best model: {best_name} (AUC={best_auc:.3f}) ACC={round(acc * 100, 2)}%")
+def select_model(scores: dict, costs: dict, budget: dict, auc_tolerance: float = 0.0) -> str:
+    """
+    Among the candidates within `budget`, those within `auc_tolerance` of
+    the best AUC are treated as equally good and the cheapest to serve wins.
+    If nothing fits the budget, the smallest candidate is chosen.
+    """
+    eligible = [name for name in scores if not budget_violations(costs[name], budget)]
+    if not eligible:
+        print(f"⚠️ No candidate fits the serving budget {budget}; picking the smallest")
+        return min(scores, key=lambda name: costs[name]["size_mb"])
+    top_auc = max(scores[name]["auc"] for name in eligible)
+    near_best = [name for name in eligible if scores[name]["auc"] >= top_auc - auc_tolerance]
+    return min(near_best, key=lambda name: (costs[name]["batch_ms"], costs[name]["size_mb"],
+                                            -scores[name]["auc"], -scores[name]["acc"]))
+
+
+def report_selection(scores: dict, costs: dict, budget: dict, parents: dict, chosen: str):
+    print(f"{'candidate':<26}{'AUC':>7}{'ACC':>8}{'size MB':>10}{'1-row ms':>10}{'batch ms':>10}")
+    for name in scores:
+        m, c = scores[name], costs[name]
+        note = ", ".join(f"over {v}" for v in budget_violations(c, budget))
+        if name in parents:
+            parent = scores[parents[name]]
+            note = ", ".join(filter(None, [f"ΔAUC {m['auc'] - parent['auc']:+.3f} ΔACC {m['acc'] - parent['acc']:+.3f}",
+                                           note]))
+        mark = "🏆" if name == chosen else "  "
+        print(f"{mark}{name:<24}{m['auc']:7.3f}{m['acc']:8.3f}{c['size_mb']:10.3f}{c['single_ms']:10.3f}"
+              f"{c['batch_ms']:10.3f}  {note}")
+
+
+def train_and_log_models(X_train, X_test, y_train, y_test, feature_cols, parallel=False, cpu_budget=None,
+                         feedback_hwm=0, budget=None, auc_tolerance=MODEL_AUC_TOLERANCE, compact=False):
+    import mlflow
+    import mlflow.sklearn
+    from imblearn.over_sampling import RandomOverSampler
+    from sklearn.metrics import confusion_matrix
+
+    budget = budget or {"size_mb": MODEL_MAX_SIZE_MB, "single_ms": MODEL_MAX_SINGLE_MS,
+                        "batch_ms": MODEL_MAX_BATCH_MS}
+    ros = RandomOverSampler(random_state=44)
+    X_train_bal, y_train_bal = ros.fit_resample(X_train, y_train)
+
+    mlflow.set_experiment("heart_disease_prediction")
 
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(best, "models/model.pkl")
-    print("✅ model.pkl updated")
+    started = time.perf_counter()
+    fitted = fit_candidates(X_train_bal, y_train_bal, parallel=parallel, cpu_budget=cpu_budget)
+    print(f"⏱️ Candidate search took {time.perf_counter() - started:.1f}s")
+    for name in CANDIDATE_NAMES:
+        print(f"✔ {name} fitted in {fitted[name][3]:.1f}s")
 
+    models = {name: fitted[name][1] for name in CANDIDATE_NAMES}
+    scores = {name: evaluate(models[name], X_test, y_test) for name in CANDIDATE_NAMES}
+
+    with mlflow.start_run(run_name="RF_LR_Baselines"):
+        for name in ("RandomForest", "LogisticRegression"):
+            mlflow.log_metric(f"{name}_auc", scores[name]["auc"])
+            mlflow.log_metric(f"{name}_acc", scores[name]["acc"])
+            mlflow.log_metric(f"{name}_f1", scores[name]["f1"])
+
+    with mlflow.start_run(run_name="XGB_Tuned"):
+        mlflow.log_params(fitted["XGB_Tuned"][2])
+        m = scores["XGB_Tuned"]
+        mlflow.log_metrics({"auc": m["auc"], "accuracy": m["acc"], "f1": m["f1"]})
+
+    # ---------- 2.1 compacted variants + serving cost ---------------
+    parents = {}
+    if compact:
+        report_progress(0.80, "compacting candidates")
+        for name in CANDIDATE_NAMES:
+            for variant, small in compact_variants(name, models[name]):
+                models[variant], parents[variant] = small, name
+                scores[variant] = evaluate(small, X_test, y_test)
+    costs = {name: serving_cost(model, X_test) for name, model in models.items()}
+
+    best_name = select_model(scores, costs, budget, auc_tolerance)
+    best, best_auc, best_acc = models[best_name], scores[best_name]["auc"], scores[best_name]["acc"]
+    report_selection(scores, costs, budget, parents, best_name)
+
+    with mlflow.start_run(run_name="Serving_Cost"):
+        mlflow.log_params({f"budget_{key}": limit for key, limit in budget.items()})
+        mlflow.log_param("selected", best_name)
+        for name in models:
+            mlflow.log_metrics({f"{name}_{key}": value for key, value in costs[name].items()})
+            if name in parents:
+                mlflow.log_metric(f"{name}_auc", scores[name]["auc"])
+                mlflow.log_metric(f"{name}_acc", scores[name]["acc"])
+
+    print(confusion_matrix(y_test, best.predict(X_test)))
+    print(f"🏆 Best model: {best_name} (AUC={best_auc:.3f}) ACC={round(best_acc * 100, 2)}% "
+          f"[{costs[best_name]['size_mb']:.2f} MB, {costs[best_name]['single_ms']:.3f} ms/row, "
+          f"{costs[best_name]['batch_ms']:.3f} ms/{COST_BATCH_ROWS} rows]")
+
+    report_progress(0.85, "publishing model")
+    version = export_and_publish(best, best_name, X_test)
+    write_train_state({
+        "feedback_high_water_mark": feedback_hwm,
+        "last_full_rebuild": time.time(),
+        "model_name": best_name,
+        "model_version": version,
+        "reference_accuracy": best_acc,
+        "reference_mean": X_train.mean().tolist(),
+        "reference_std": X_train.std().replace(0, 1).fillna(1).tolist(),
+        "reference_rows": len(X_train),
+        "incremental_rows": 0,
+        "serving_cost": costs[best_name],
+    })
+
+    report_progress(0.95, "registering in mlflow")
     with mlflow.start_run(run_name=f"Register_{best_name}"):
         mlflow.sklearn.log_model(best, "model", registered_model_name="heart_model")
         mlflow.log_metric("auc", best_auc)
 
+
+# ------------------------------------------------------------------ #
+# 3. INCREMENTAL UPDATE FROM NEW FEEDBACK
+# ------------------------------------------------------------------ #
+TRAIN_STATE_PATH = os.path.join(MODEL_DIR, "train_state.json")
+FULL_REBUILD_DAYS = float(os.getenv("FULL_REBUILD_DAYS", "7"))
+DRIFT_MIN_ROWS = int(os.getenv("DRIFT_MIN_ROWS", "30"))
+DRIFT_MAX_ACC_DROP = float(os.getenv("DRIFT_MAX_ACC_DROP", "0.10"))
+DRIFT_MAX_MEAN_SHIFT = float(os.getenv("DRIFT_MAX_MEAN_SHIFT", "1.0"))   # in reference std units
+XGB_INCREMENTAL_ROUNDS = int(os.getenv("XGB_INCREMENTAL_ROUNDS", "50"))
+RF_MAX_TREES = int(os.getenv("RF_MAX_TREES", "800"))
+
+
+def read_train_state():
+    try:
+        with open(TRAIN_STATE_PATH) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_train_state(state: dict):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp_path = TRAIN_STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(state, fh, indent=2)
+    os.replace(tmp_path, TRAIN_STATE_PATH)
+
+
+def max_feedback_id() -> int:
+    with read_engine.connect() as conn:
+        return conn.execute(text("SELECT MAX(id) FROM feedback")).scalar() or 0
+
+
+def load_feedback_since(high_water_mark: int):
+    """Feedback rows with id > high_water_mark as (X, y, max_id)."""
+    fb_df = load_feedback_frame(min_id=high_water_mark)
+    X = fb_df[FEATURES]
+    y = (fb_df["prediction"] > 0).astype(int)
+    return X, y, (int(fb_df["id"].max()) if len(fb_df) else high_water_mark)
+
+
+def detect_drift(model, state: dict, X_new, y_new):
+    """Return a reason string when the new rows warrant a full rebuild, else None."""
+    from sklearn.metrics import accuracy_score
+
+    if len(X_new) < DRIFT_MIN_ROWS:
+        return None
+    acc = accuracy_score(y_new, model.predict(X_new))
+    if state["reference_accuracy"] - acc > DRIFT_MAX_ACC_DROP:
+        return f"accuracy on new feedback dropped to {acc:.3f} (reference {state['reference_accuracy']:.3f})"
+    shift = np.abs(X_new.mean().to_numpy() - np.asarray(state["reference_mean"])) / np.asarray(state["reference_std"])
+    if shift.max() > DRIFT_MAX_MEAN_SHIFT:
+        return f"{FEATURES[int(shift.argmax())]} mean shifted by {shift.max():.2f} std"
+    return None
+
+
+def warm_start_update(model, X_new, y_new, base_rows: int):
+    """
+    Update `model` from the new rows only, without re-tuning:
+      - XGBoost keeps boosting from the current booster
+      - RandomForest grows extra trees in proportion to the new data; past
+        RF_MAX_TREES the oldest trees make room for them
+    Returns None for models that are cheaper to refit than to update (LR).
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from xgboost import XGBClassifier
+
+    if isinstance(model, XGBClassifier):
+        updated = XGBClassifier(**{**model.get_params(), "n_estimators": XGB_INCREMENTAL_ROUNDS})
+        updated.fit(X_new, y_new, xgb_model=model.get_booster())
+        return updated
+
+    clf = model.named_steps["clf"] if hasattr(model, "named_steps") else model
+    if isinstance(clf, RandomForestClassifier):
+        extra = max(1, round(len(clf.estimators_) * len(X_new) / max(1, base_rows)))
+        keep = min(len(clf.estimators_), max(0, RF_MAX_TREES - extra))
+        clf.estimators_ = clf.estimators_[len(clf.estimators_) - keep:]
+        clf.set_params(warm_start=True, n_estimators=keep + extra)
+        X_fit = model.named_steps["scale"].transform(X_new) if hasattr(model, "named_steps") else X_new
+        clf.fit(X_fit, y_new)
+        clf.set_params(warm_start=False)
+        return model
+    return None
+
+
+def refit_candidate(name, feedback_hwm: int):
+    """
+    Refit one candidate family, with its default settings, on every row up to
+    `feedback_hwm` - no search over the other families.
+
+    Returns:
+        (model, X_test, train-state fields describing the new reference data)
+    """
+    from imblearn.over_sampling import RandomOverSampler
+
+    X_train, X_test, y_train, y_test, _ = load_and_prepare_data(feedback_max_id=feedback_hwm)
+    X_train_bal, y_train_bal = RandomOverSampler(random_state=44).fit_resample(X_train, y_train)
+    _, model, _, seconds = fit_candidate(name, X_train_bal, y_train_bal)
+    print(f"✔ {name} refitted on {len(X_train)} rows in {seconds:.1f}s")
+    return model, X_test, {
+        "reference_accuracy": evaluate(model, X_test, y_test)["acc"],
+        "reference_mean": X_train.mean().tolist(),
+        "reference_std": X_train.std().replace(0, 1).fillna(1).tolist(),
+        "reference_rows": len(X_train),
+    }
+
+
+def incremental_update(parallel=False, cpu_budget=None, **selection):
+    """
+    Fold new feedback into the current model; fall back to a full rebuild
+    when none has happened yet, the rebuild schedule is due, or drift is detected.
+    """
+    state = read_train_state()
+    if state is None:
+        print("ℹ️ No training state yet, running a full rebuild")
+        return full_rebuild(parallel, cpu_budget, **selection)
+    if time.time() - state["last_full_rebuild"] > FULL_REBUILD_DAYS * 86400:
+        print(f"ℹ️ Last full rebuild is older than {FULL_REBUILD_DAYS} days, running a full rebuild")
+        return full_rebuild(parallel, cpu_budget, **selection)
+
+    X_new, y_new, new_hwm = load_feedback_since(state["feedback_high_water_mark"])
+    if X_new.empty:
+        print("✅ No new feedback since the last training run")
+        return
+    print(f"✅ {len(X_new)} new feedback rows (ids > {state['feedback_high_water_mark']})")
+    if y_new.nunique() < 2:
+        print("ℹ️ New feedback covers a single class; waiting for more rows")
+        return
+
+    report_progress(0.30, "checking drift")
+    model = ModelRegistry(prefer_compiled=False).current().model
+    reason = detect_drift(model, state, X_new, y_new)
+    if reason:
+        print(f"⚠️ Drift detected: {reason}; running a full rebuild")
+        return full_rebuild(parallel, cpu_budget, **selection)
+
+    report_progress(0.50, f"updating {state['model_name']}")
+    base_rows = state.get("reference_rows", len(X_new))
+    updated = warm_start_update(model, X_new, y_new, base_rows)
+    X_check, reference = X_new, {"reference_rows": base_rows + len(X_new)}
+    if updated is None:
+        if state["model_name"] not in CANDIDATE_NAMES:
+            print(f"ℹ️ {state['model_name']} has no incremental path; running a full rebuild")
+            return full_rebuild(parallel, cpu_budget, **selection)
+        print(f"ℹ️ {state['model_name']} is cheap to refit; refitting it alone on all rows")
+        updated, X_check, reference = refit_candidate(state["model_name"], new_hwm)
+
+    report_progress(0.85, "publishing model")
+    version = export_and_publish(updated, state["model_name"], X_check)
+    state.update({
+        "feedback_high_water_mark": new_hwm,
+        "model_version": version,
+        "incremental_rows": state.get("incremental_rows", 0) + len(X_new),
+        **reference,
+    })
+    write_train_state(state)
+
+    import mlflow
+    from sklearn.metrics import accuracy_score
+
+    with mlflow.start_run(run_name=f"Incremental_{state['model_name']}"):
+        mlflow.log_metric("new_rows", len(X_new))
+        mlflow.log_metric("new_rows_accuracy", accuracy_score(y_new, updated.predict(X_new)))
+
+
+def full_rebuild(parallel=False, cpu_budget=None, **selection):
+    # pin the mark first so the rows trained on are exactly those up to it
+    feedback_hwm = max_feedback_id()
+    report_progress(0.05, "loading data")
+    X_train, X_test, y_train, y_test, FEATS = load_and_prepare_data(feedback_max_id=feedback_hwm)
+    train_and_log_models(X_train, X_test, y_train, y_test, FEATS,
+                         parallel=parallel, cpu_budget=cpu_budget, feedback_hwm=feedback_hwm, **selection)
+
 # ------------------------------------------------------------------ #
-# 3. MAIN
+# 4. MAIN
 # ------------------------------------------------------------------ #
 if __name__ == "__main__":
-    X_train, X_test, y_train, y_test, FEATS = load_and_prepare_data()
-    train_and_log_models(X_train, X_test, y_train, y_test, FEATS)
+    parser = argparse.ArgumentParser(description="Train, select and publish the heart disease model.")
+    parser.add_argument("--parallel", action="store_true",
+                        default=os.getenv("TRAIN_PARALLEL", "0") == "1",
+                        help="fit candidate families concurrently with successive-halving XGB search")
+    parser.add_argument("--cpus", type=int,
+                        default=int(os.getenv("TRAIN_CPU_BUDGET", "0")) or None,
+                        help="total CPU budget for --parallel (default: all cores)")
+    parser.add_argument("--incremental", action="store_true",
+                        default=os.getenv("TRAIN_INCREMENTAL", "0") == "1",
+                        help="update the current model from new feedback only; "
+                             "falls back to a full rebuild on schedule or drift")
+    parser.add_argument("--max-size-mb", type=float, default=MODEL_MAX_SIZE_MB,
+                        help="serving budget: largest served artifact (0 = no limit)")
+    parser.add_argument("--max-single-ms", type=float, default=MODEL_MAX_SINGLE_MS,
+                        help="serving budget: single-row predict latency (0 = no limit)")
+    parser.add_argument("--max-batch-ms", type=float, default=MODEL_MAX_BATCH_MS,
+                        help=f"serving budget: {COST_BATCH_ROWS}-row predict latency (0 = no limit)")
+    parser.add_argument("--auc-tolerance", type=float, default=MODEL_AUC_TOLERANCE,
+                        help="candidates within this AUC of the best count as tied; the cheapest one wins")
+    parser.add_argument("--compact", action="store_true",
+                        default=os.getenv("TRAIN_COMPACT", "0") == "1",
+                        help="also consider smaller RandomForests (first COMPACT_TREES trees) and report their cost")
+    args = parser.parse_args()
+
+    selection = {
+        "budget": {"size_mb": args.max_size_mb, "single_ms": args.max_single_ms, "batch_ms": args.max_batch_ms},
+        "auc_tolerance": args.auc_tolerance,
+        "compact": args.compact,
+    }
+    if args.incremental:
+        incremental_update(parallel=args.parallel, cpu_budget=args.cpus, **selection)
+    else:
+        full_rebuild(parallel=args.parallel, cpu_budget=args.cpus, **selection)
@@ -1,5 +1,7 @@
 import streamlit as st
 import os
+import time
+import json
 import requests
 
 # --- CONFIG ---
@@ -72,6 +74,15 @@ def encode_input(form):
 
     return data
 
+def read_events(response):
+    # 📡 minimal server-sent events reader: yields (event, json payload)
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
 # --- PREDICT PAGE ---
 if st.session_state.page == "predict":
     st.title("💓 Heart Disease Prediction")
@@ -99,26 +110,23 @@ if st.session_state.page == "predict":
         data = encode_input(form)
         headers = {"Authorization": f"Bearer {st.session_state.token}"}
         try:
-            # 🎯 Step 1: Predict
-            res = requests.post(f"{API_URL}/predict", json=data, headers=headers)
+            # 🎯 One request: the prediction arrives first, the advice streams in when ready
+            res = requests.post(f"{API_URL}/predict/advise", json=data, headers=headers, stream=True)
             if res.status_code == 200:
-                result = res.json()
-                predicted_class = result["predicted_class"]
-                st.success(f"🎯 Prediction: {result['prediction']}")
-                st.info(f"🔢 Predicted class: {predicted_class}")
-
-                # 💡 Step 2: Get LLM Advice
-                advice_payload = {
-                    "prediction": str(predicted_class),
-                    "patient_data": data,
-                }
-                advice_res = requests.post(f"{API_URL}/advise", json=advice_payload, headers=headers)
-                if advice_res.status_code == 200:
-                    advice = advice_res.json()["advice"]
-                    st.markdown("🧠 **LLM Medical Advice:**")
-                    st.success(advice)
-                else:
-                    st.warning("⚠️ Advice could not be retrieved.")
+                advice_slot = None
+                for event, payload in read_events(res):
+                    if event == "prediction":
+                        st.success(f"🎯 Prediction: {payload['prediction']}")
+                        st.info(f"🔢 Predicted class: {payload['predicted_class']}")
+                        advice_slot = st.empty()
+                        advice_slot.info("🧠 Generating advice...")
+                    elif event == "advice" and advice_slot is not None:
+                        with advice_slot.container():
+                            st.markdown("🧠 **LLM Medical Advice:**")
+                            st.success(payload["advice"])
+                        advice_slot = None
+                if advice_slot is not None:
+                    advice_slot.warning("⚠️ Advice could not be retrieved.")
             else:
                 st.error(f"❌ Prediction API Error: {res.status_code}")
         except Exception as e:
@@ -168,9 +176,20 @@ elif st.session_state.page == "retrain":
             headers = {"Authorization": f"Bearer {st.session_state.token}"}
             try:
                 res = requests.post(f"{API_URL}/retrain", headers=headers)
-                if res.status_code == 200:
-                    result = res.json()
-                    st.success(f"✅ Model retrained successfully!")
+                if res.status_code == 202:
+                    job_id = res.json()["job_id"]
+                    progress = st.progress(0.0, text="Queued")
+                    # ⏳ Poll the background job until it finishes
+                    while True:
+                        job = requests.get(f"{API_URL}/retrain/{job_id}", headers=headers).json()
+                        progress.progress(min(job["progress"], 1.0), text=job["stage"])
+                        if job["status"] not in ("queued", "running"):
+                            break
+                        time.sleep(2)
+                    if job["status"] == "succeeded":
+                        st.success(f"✅ Model retrained successfully! (version {job['model_version']})")
+                    else:
+                        st.error(f"❌ Retrain {job['status']}: {job.get('error') or 'Unknown error'}")
                 else:
                     st.error(f"❌ Retrain failed: {res.json().get('detail', 'Unknown error')}")
             except Exception as e:
@@ -0,0 +1,59 @@
+import asyncio
+
+from app.llm_advice import AdviceService, TemplateBackend, bucket_features
+
+PATIENT = {"age": 63, "sex": 1, "cp": 3, "trestbps": 145, "chol": 233, "fbs": 1, "restecg": 0,
+           "thalch": 150, "exang": 0, "oldpeak": 2.3, "slope": 0, "ca": 0, "thal": 1}
+
+
+class SlowBackend:
+    name = "slow"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    async def generate(self, prediction, buckets):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"advice for {prediction}"
+
+
+def test_similar_patients_share_a_cache_entry():
+    assert bucket_features(PATIENT) == bucket_features(dict(PATIENT, age=67, chol=239))
+    assert bucket_features(PATIENT) != bucket_features(dict(PATIENT, chol=241))
+
+    service = AdviceService(TemplateBackend())
+    first = asyncio.run(service.get_advice("1", PATIENT))
+    second = asyncio.run(service.get_advice(1, dict(PATIENT, age=67)))
+    assert first["source"] == "template" and second["source"] == "cache"
+    assert first["advice"] == second["advice"]
+
+
+def test_identical_requests_are_coalesced():
+    backend = SlowBackend(delay=0.05)
+    service = AdviceService(backend, max_concurrency=1)
+
+    async def burst():
+        return await asyncio.gather(*(service.get_advice("0", PATIENT) for _ in range(10)))
+
+    results = asyncio.run(burst())
+    assert backend.calls == 1 and service.coalesced == 9
+    assert {r["advice"] for r in results} == {"advice for 0"}
+
+
+def test_timeout_falls_back_to_template():
+    service = AdviceService(SlowBackend(delay=1.0), timeout=0.01, cache_size=0)
+    result = asyncio.run(service.get_advice("1", PATIENT))
+    assert result["source"] == "fallback"
+    assert result["advice"] == TemplateBackend.render("1", bucket_features(PATIENT))
+    assert service.timeouts == 1
+
+
+def test_non_finite_values_are_left_unbucketed():
+    buckets = dict(bucket_features(dict(PATIENT, oldpeak="inf", chol=float("nan"), ca="-inf")))
+    assert buckets["oldpeak"] is None and buckets["chol"] is None and buckets["ca"] is None
+    assert buckets["age"] is not None
+
+    result = asyncio.run(AdviceService(TemplateBackend()).get_advice("1", dict(PATIENT, oldpeak="nan")))
+    assert result["advice"]
@@ -1,6 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from app.inference import compile_model
 from app.main import app
+from app.model_registry import publish_model, registry
+from app.schemas import HEART_FEATURES
+from ml.train_model import load_clean_csv
 
 client = TestClient(app)
 
@@ -8,12 +15,35 @@ client = TestClient(app)
 USERNAME = "admin"
 PASSWORD = "password123"
 
+@pytest.fixture(scope="module", autouse=True)
+def started_app(tmp_path_factory):
+    # serve a model published for this module, not whatever models/ happens to hold
+    df = load_clean_csv().dropna(subset=["target"])
+    X = df[HEART_FEATURES].fillna(df[HEART_FEATURES].median())
+    model = Pipeline([("scale", StandardScaler()), ("clf", LogisticRegression(max_iter=1000))])
+    model.fit(X.to_numpy(dtype=float), (df["target"] > 0).astype(int))
+    model_dir = str(tmp_path_factory.mktemp("models"))
+    publish_model(model, model_dir=model_dir, compiled=compile_model(model))
+
+    original_dir, registry.model_dir = registry.model_dir, model_dir
+    registry.reload(force=True)
+    # run the lifespan: database setup, model preload and warm-up
+    with client:
+        yield
+    registry.model_dir = original_dir
+
 @pytest.fixture
 def token():
     response = client.post("/login", data={"username": USERNAME, "password": PASSWORD})
     assert response.status_code == 200
     return response.json()["access_token"]
 
+def test_ready():
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert response.json()["model_version"]
+
 def test_login():
     response = client.post("/login", data={"username": USERNAME, "password": PASSWORD})
     assert response.status_code == 200
@@ -65,5 +95,135 @@ def test_feedback(token):
 def test_retrain(token):
     headers = {"Authorization": f"Bearer {token}"}
     response = client.post("/retrain", headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    status = client.get(f"/retrain/{job_id}", headers=headers)
+    assert status.status_code == 200
+    assert status.json()["status"] in ("queued", "running")
+
+    cancelled = client.post(f"/retrain/{job_id}/cancel", headers=headers)
+    assert cancelled.status_code == 200
+    assert client.get("/retrain/unknown", headers=headers).status_code == 404
+
+def test_predict_batch(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    row = {
+        "age": 60, "sex": 1, "cp": 3, "trestbps": 140, "chol": 250,
+        "fbs": 1, "restecg": 0, "thalch": 150, "exang": 0,
+        "oldpeak": 2.3, "slope": 1, "ca": 0, "thal": 2
+    }
+    bad_row = dict(row, age="sixty")
+    response = client.post("/predict/batch", json={"rows": [row, bad_row, row]}, headers=headers)
     assert response.status_code == 200
-    assert response.json()["message"].startswith("Model retrained")
+    body = response.json()
+    assert body["valid"] == 2 and body["invalid"] == 1
+    assert "errors" in body["results"][1]
+    assert body["results"][0]["predicted_class"] == body["results"][2]["predicted_class"]
+    assert 0.0 <= body["results"][0]["probability"] <= 1.0
+
+def test_predict_explain(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    row = {
+        "age": 67, "sex": 1, "cp": 0, "trestbps": 160, "chol": 286,
+        "fbs": 0, "restecg": 0, "thalch": 108, "exang": 1,
+        "oldpeak": 1.5, "slope": 1, "ca": 3, "thal": 2
+    }
+    single = client.post("/predict", params={"explain": "true"}, json=row, headers=headers)
+    assert single.status_code == 200
+    explanation = single.json()["explanation"]
+    assert set(explanation["contributions"]) == set(row)
+    assert len(explanation["top_features"]) == 3
+    assert explanation["method"] in ("exact", "approximate")
+
+    batch = client.post("/predict/batch", params={"explain": "true"}, json={"rows": [row, dict(row, age="x")]},
+                        headers=headers).json()
+    assert batch["results"][0]["explanation"] == explanation
+    assert "explanation" not in batch["results"][1]
+    assert "explanation" not in client.post("/predict", json=row, headers=headers).json()
+
+def test_predict_cache(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    sample_input = {
+        "age": 41, "sex": 0, "cp": 1, "trestbps": 130, "chol": 204,
+        "fbs": 0, "restecg": 0, "thalch": 172, "exang": 0,
+        "oldpeak": 1.4, "slope": 0, "ca": 0, "thal": 2
+    }
+    first = client.post("/predict", json=sample_input, headers=headers)
+    hits_before = client.get("/predict/stats", headers=headers).json()["cache"]["hits"]
+    second = client.post("/predict", json=sample_input, headers=headers)
+    assert first.json() == second.json()
+    assert client.get("/predict/stats", headers=headers).json()["cache"]["hits"] == hits_before + 1
+
+def test_feedback_bulk(token):
+    import time
+    headers = {"Authorization": f"Bearer {token}"}
+    # unique per run so earlier runs' rows don't turn these into duplicates
+    chol = 100 + int(time.time() * 1000) % 100000
+    row = {
+        "age": 52, "sex": 1, "cp": 0, "trestbps": 125, "chol": chol,
+        "fbs": 0, "restecg": 1, "thalch": 168, "exang": 0,
+        "oldpeak": 1.0, "slope": 2, "ca": 2, "thal": 3, "prediction": 0
+    }
+    bad_row = dict(row)
+    del bad_row["prediction"]
+    rows = [row, bad_row, dict(row, age=53), dict(row)]
+    response = client.post("/feedback/bulk", json={"rows": rows}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["valid"] == 3 and body["invalid"] == 1 and body["duplicates"] == 1
+    assert "errors" in body["results"][1]
+    assert body["results"][0]["id"] == body["first_id"]
+    assert body["results"][2]["id"] == body["last_id"] > body["first_id"]
+    assert body["results"][3]["duplicate"] and body["results"][3]["id"] is None
+
+def test_advise(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    payload = {"prediction": "1", "patient_data": {"age": 60, "chol": 250, "trestbps": 140}}
+    response = client.post("/advise", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["advice"]
+
+def test_predict_and_advise_stream(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    sample_input = {
+        "age": 60, "sex": 1, "cp": 3, "trestbps": 140, "chol": 250,
+        "fbs": 1, "restecg": 0, "thalch": 150, "exang": 0,
+        "oldpeak": 2.3, "slope": 1, "ca": 0, "thal": 2
+    }
+    response = client.post("/predict/advise", json=sample_input, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events == ["prediction", "advice", "done"]
+
+def test_metrics(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    sample_input = {
+        "age": 55, "sex": 0, "cp": 2, "trestbps": 130, "chol": 220,
+        "fbs": 0, "restecg": 1, "thalch": 160, "exang": 0,
+        "oldpeak": 0.8, "slope": 1, "ca": 0, "thal": 2
+    }
+    client.post("/predict", json=sample_input, headers=headers)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/predict",status="200"}' in body
+    assert "prediction_cache_hits" in body
+    assert "inference_seconds_bucket" in body
+
+def test_predict_trace_header(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    sample_input = {
+        "age": 47, "sex": 1, "cp": 1, "trestbps": 128, "chol": 231,
+        "fbs": 0, "restecg": 0, "thalch": 165, "exang": 0,
+        "oldpeak": 0.4, "slope": 1, "ca": 0, "thal": 2
+    }
+    untraced = client.post("/predict", json=sample_input, headers=headers)
+    assert "server-timing" not in untraced.headers
+
+    traced = client.post("/predict", json=sample_input, headers={**headers, "X-Trace": "1"})
+    assert traced.status_code == 200
+    stages = {part.split(";")[0].strip() for part in traced.headers["server-timing"].split(",")}
+    assert {"auth", "handler", "cache", "validation", "serialize", "total"} <= stages
+    assert traced.headers["x-trace-id"]
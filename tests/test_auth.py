@@ -0,0 +1,72 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable clock shared by create_access_token, the token cache and PyJWT."""
+    now = SimpleNamespace(t=1_700_000_000.0)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(now.t, tz)
+
+    monkeypatch.setattr(auth, "time", SimpleNamespace(time=lambda: now.t))
+    monkeypatch.setattr(auth.jwt.api_jwt, "datetime", FrozenDatetime)
+    return now
+
+
+def _reject(token):
+    with pytest.raises(HTTPException) as exc:
+        auth.get_current_user(token)
+    return exc.value.detail
+
+
+def test_cached_token_is_served_without_decoding(monkeypatch):
+    token = auth.create_access_token({"sub": "admin"})
+    assert auth.get_current_user(token) == "admin"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("token was decoded again")
+    monkeypatch.setattr(auth.jwt, "decode", fail)
+    hits = auth.token_cache.hits
+    assert auth.get_current_user(token) == "admin"
+    assert auth.token_cache.hits == hits + 1
+
+
+def test_tampered_and_expired_tokens_still_rejected(clock):
+    token = auth.create_access_token({"sub": "admin"})
+    auth.get_current_user(token)
+    assert _reject(token[:-2] + ("AA" if not token.endswith("AA") else "BB")) == "Invalid token"
+
+    clock.t = 1_700_000_000.8
+    short = auth.create_access_token({"sub": "admin"}, expires_delta=0.3)
+    assert auth.get_current_user(short) == "admin"
+    clock.t += 0.4
+    assert _reject(short) == "Token expired"
+
+
+def test_rotation_invalidates_cached_tokens(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", auth.SECRET_KEY)
+    token = auth.create_access_token({"sub": "admin"})
+    assert auth.get_current_user(token) == "admin"
+    auth.rotate_signing_key("rotated_secret")
+    assert _reject(token) == "Invalid token"
+    assert auth.get_current_user(auth.create_access_token({"sub": "admin"})) == "admin"
+
+
+def test_cached_token_expires_at_truncated_exp(clock):
+    # exp = ...123.95 is 123 to PyJWT; a cache hit at ...123.348 must not outlive it
+    clock.t = 1_700_000_122.8
+    token = auth.create_access_token({"sub": "admin"}, expires_delta=1.15)
+    assert auth.get_current_user(token) == "admin"
+    clock.t = 1_700_000_123.348
+    with pytest.raises(auth.jwt.ExpiredSignatureError):
+        auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    assert _reject(token) == "Token expired"
@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+
+from app.batching import MicroBatcher
+
+
+class ThresholdModel:
+    classes_ = np.array([0, 1])
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        p = (X[:, 0] > 50).astype(float) * 0.8 + 0.1
+        return np.column_stack([1 - p, p])
+
+
+def test_results_go_back_to_their_callers():
+    model = ThresholdModel()
+    batcher = MicroBatcher(max_batch_size=16, max_wait=0.01)
+    results = {}
+
+    def call(age):
+        results[age] = batcher.predict(model, np.array([[age] + [0] * 12], dtype=float))
+
+    threads = [threading.Thread(target=call, args=(age,)) for age in range(30, 70)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    for age, (predicted_class, proba) in results.items():
+        assert predicted_class == int(age > 50)
+        assert abs(proba - (0.9 if age > 50 else 0.1)) < 1e-9
+    stats = batcher.stats()
+    assert stats["rows"] == 40
+    assert stats["batches"] == model.calls
+    assert stats["largest_batch"] <= 16
+
+
+def test_errors_propagate():
+    class Broken:
+        def predict_proba(self, X):
+            raise ValueError("boom")
+
+    batcher = MicroBatcher()
+    try:
+        batcher.predict(Broken(), np.zeros((1, 13)))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    finally:
+        batcher.close()
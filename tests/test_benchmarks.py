@@ -0,0 +1,22 @@
+from benchmarks.load import compare, summarize
+
+
+def _record(p95, rps, errors=0):
+    return {"transport": "asgi", "model": "rf", "endpoint": "predict",
+            "p95_ms": p95, "throughput_rps": rps, "errors": errors}
+
+
+def test_summarize_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)], errors=2, elapsed=2.0)
+    assert summary["requests"] == 100 and summary["errors"] == 2
+    assert summary["throughput_rps"] == 50.0
+    assert round(summary["p50_ms"], 1) == 50.5 and summary["max_ms"] == 100.0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = [_record(p95=10.0, rps=500.0)]
+    assert compare([_record(p95=11.0, rps=460.0)], baseline, max_regression=0.15) == []
+    regressions = compare([_record(p95=12.0, rps=400.0, errors=1)], baseline, max_regression=0.15)
+    assert len(regressions) == 3
+    # other transports are not compared with each other
+    assert compare([dict(_record(p95=50.0, rps=1.0), transport="uvicorn")], baseline, 0.15) == []
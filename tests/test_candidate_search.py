@@ -0,0 +1,47 @@
+import numpy as np
+import sklearn.model_selection
+from sklearn.datasets import make_classification
+
+from ml import train_model
+
+
+def _data():
+    return make_classification(n_samples=200, n_features=13, random_state=0)
+
+
+def _families(fitted):
+    return {name: (type(model).__name__, type(getattr(model, "named_steps", {}).get("clf")).__name__)
+            for name, (_, model, _, _) in fitted.items()}
+
+
+def test_parallel_search_fits_the_same_families():
+    X, y = _data()
+    serial = train_model.fit_candidates(X, y)
+    parallel = train_model.fit_candidates(X, y, parallel=True, cpu_budget=2)
+
+    assert set(parallel) == set(serial) == set(train_model.CANDIDATE_NAMES)
+    assert _families(parallel) == _families(serial)
+    for name, (fitted_name, model, _, seconds) in parallel.items():
+        assert fitted_name == name and seconds > 0
+        assert model.predict_proba(X[:5]).shape == (5, 2)
+    assert parallel["XGB_Tuned"][2] is not None
+
+
+def test_halving_returns_the_best_of_its_final_round(monkeypatch):
+    searches = []
+
+    class RecordingSearch(sklearn.model_selection.HalvingRandomSearchCV):
+        def fit(self, *args, **kwargs):
+            searches.append(self)
+            return super().fit(*args, **kwargs)
+
+    monkeypatch.setattr(sklearn.model_selection, "HalvingRandomSearchCV", RecordingSearch)
+    X, y = _data()
+    _, model, params, _ = train_model.fit_candidate("XGB_Tuned", X, y, n_jobs=1, search="halving")
+
+    results = searches[0].cv_results_
+    final = np.flatnonzero(results["iter"] == results["iter"].max())
+    best = final[np.argmax(results["mean_test_score"][final])]
+    assert params == results["params"][best]
+    # the winner is refit with the full tree budget
+    assert params["n_estimators"] == model.n_estimators == 540
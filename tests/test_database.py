@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import create_storage_engine
+
+
+def test_wal_and_read_only_path(tmp_path):
+    url = f"sqlite:///{tmp_path / 'feedback.db'}"
+    writer = create_storage_engine(url)
+    reader = create_storage_engine(url, read_only=True)
+
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        conn.execute(text("CREATE TABLE feedback (id INTEGER PRIMARY KEY, age INTEGER)"))
+        conn.execute(text("INSERT INTO feedback (age) VALUES (60)"))
+
+    # an open write transaction doesn't stall the reader under WAL
+    with writer.begin() as wconn, reader.connect() as rconn:
+        wconn.execute(text("INSERT INTO feedback (age) VALUES (61)"))
+        assert rconn.execute(text("SELECT COUNT(*) FROM feedback")).scalar() == 1
+
+    with reader.connect() as rconn:
+        assert rconn.execute(text("SELECT COUNT(*) FROM feedback")).scalar() == 2
+        with pytest.raises(OperationalError):
+            rconn.execute(text("INSERT INTO feedback (age) VALUES (62)"))
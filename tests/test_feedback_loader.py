@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, insert
+
+from app.models import Base, Feedback
+from ml.feedback_loader import iter_feedback_chunks, load_feedback_frame
+
+
+def _engine(tmp_path, n):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fb.db'}")
+    Base.metadata.create_all(bind=engine)
+    rows = [
+        dict(age=40 + i, sex=i % 2, cp=1, trestbps=120, chol=200, fbs=0, restecg=0,
+             thalch=150, exang=0, oldpeak=0.5 * i, slope=1, ca=0, thal=2, prediction=i % 2)
+        for i in range(n)
+    ]
+    rows[3]["chol"] = None          # NULL feature -> NaN
+    rows[4]["prediction"] = None    # unlabeled rows are skipped
+    with engine.begin() as conn:
+        conn.execute(insert(Feedback), rows)
+    return engine
+
+
+def test_chunks_are_bounded_and_ordered(tmp_path):
+    engine = _engine(tmp_path, 25)
+    chunks = list(iter_feedback_chunks(chunk_size=10, engine=engine))
+    assert [len(c) for c in chunks] == [10, 10, 4]
+    ids = [int(i) for c in chunks for i in c["id"]]
+    assert ids == sorted(ids) and 5 not in ids
+
+
+def test_id_range_and_types(tmp_path):
+    engine = _engine(tmp_path, 25)
+    df = load_feedback_frame(min_id=2, max_id=12, chunk_size=4, engine=engine)
+    assert df["id"].tolist() == [3, 4, 6, 7, 8, 9, 10, 11, 12]
+    assert df["chol"].isna().sum() == 1
+    assert df["oldpeak"].dtype == "float64" and df["prediction"].dtype == "int64"
+    assert load_feedback_frame(min_id=100, engine=engine).empty
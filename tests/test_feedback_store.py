@@ -0,0 +1,48 @@
+from sqlalchemy import create_engine, text
+
+from app.compact_feedback import compact_feedback
+from app.feedback_store import FEEDBACK_COLUMNS, content_hash, ensure_content_hash, insert_feedback
+
+ROW = {
+    "age": 60, "sex": 1, "cp": 3, "trestbps": 140, "chol": 250, "fbs": 1, "restecg": 0,
+    "thalch": 150, "exang": 0, "oldpeak": 2.3, "slope": 1, "ca": 0, "thal": 2, "prediction": 1,
+}
+LEGACY_SCHEMA = (
+    "CREATE TABLE feedback (id INTEGER PRIMARY KEY, "
+    + ", ".join(f"{name} {'FLOAT' if name == 'oldpeak' else 'INTEGER'}" for name in FEEDBACK_COLUMNS)
+    + ")"
+)
+
+
+def _legacy_engine(tmp_path, rows):
+    engine = create_engine(f"sqlite:///{tmp_path / 'feedback.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_SCHEMA))
+        if rows:
+            conn.execute(text(f"INSERT INTO feedback ({', '.join(FEEDBACK_COLUMNS)}) "
+                              f"VALUES ({', '.join(':' + n for n in FEEDBACK_COLUMNS)})"), rows)
+    return engine
+
+
+def test_hash_is_type_insensitive():
+    assert content_hash(ROW) == content_hash(dict(ROW, age=60.0))
+    assert content_hash(ROW) != content_hash(dict(ROW, prediction=0))
+
+
+def test_duplicates_rejected_at_insert(tmp_path):
+    engine = _legacy_engine(tmp_path, [])
+    ensure_content_hash(engine)
+    first, repeat, other = insert_feedback([ROW, ROW, dict(ROW, age=61)], engine=engine)
+    assert first is not None and other is not None and repeat is None
+    assert insert_feedback([ROW], engine=engine) == [None]
+
+
+def test_compaction_backfills_and_dedups(tmp_path):
+    engine = _legacy_engine(tmp_path, [ROW, dict(ROW, age=61), ROW, ROW])
+    counts = compact_feedback(engine=engine)
+    assert counts == {"hashed": 2, "removed": 2, "distinct": 2}
+    with engine.connect() as conn:
+        ids = conn.execute(text("SELECT id FROM feedback WHERE content_hash IS NOT NULL ORDER BY id")).scalars().all()
+    assert ids == [1, 2]
+    # the backfilled hash now blocks the same row at insert time
+    assert insert_feedback([ROW], engine=engine) == [None]
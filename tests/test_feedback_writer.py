@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, func, select
+
+from app.feedback_writer import FeedbackWriter
+from app.models import Base, Feedback
+
+ROW = {
+    "age": 60, "sex": 1, "cp": 3, "trestbps": 140, "chol": 250, "fbs": 1, "restecg": 0,
+    "thalch": 150, "exang": 0, "oldpeak": 2.3, "slope": 1, "ca": 0, "thal": 2, "prediction": 1,
+}
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'feedback.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Feedback)).scalar()
+
+
+def test_flush_and_drain(tmp_path):
+    engine = _engine(tmp_path)
+    writer = FeedbackWriter(flush_interval=60, flush_size=1000, log_path=str(tmp_path / "wb.log"), engine=engine)
+    for age in range(40, 45):
+        writer.submit(dict(ROW, age=age))
+    assert _count(engine) == 0
+    assert writer.stats()["queue_depth"] == 5
+
+    writer.flush()
+    assert _count(engine) == 5
+    writer.submit(dict(ROW, age=70))
+    writer.close()
+    assert _count(engine) == 6
+    stats = writer.stats()
+    assert stats["queue_depth"] == 0 and stats["flushed"] == 6 and stats["pending_log_segments"] == 0
+
+
+def test_replay_after_crash(tmp_path):
+    engine = _engine(tmp_path)
+    log_path = tmp_path / "wb.log"
+    # what a process killed before its first flush leaves behind, including a torn last line
+    log_path.write_text('{"age": 50, "sex": 0, "cp": 1, "trestbps": 120, "chol": 200, "fbs": 0, '
+                        '"restecg": 0, "thalch": 160, "exang": 0, "oldpeak": 0.5, "slope": 1, '
+                        '"ca": 0, "thal": 2, "prediction": 0}\n{"age": 5')
+
+    writer = FeedbackWriter(flush_interval=60, log_path=str(log_path), engine=engine)
+    assert writer.replayed == 1
+    writer.close()
+    assert _count(engine) == 1
+    assert not list(tmp_path.glob("wb.log.*"))
+
+
+def test_processes_keep_separate_logs(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    log_path = str(tmp_path / "wb.log")
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+
+    # two live API workers sharing one FEEDBACK_WRITE_LOG
+    monkeypatch.setattr(os, "getpid", lambda: other.pid)
+    crashed = FeedbackWriter(flush_interval=60, log_path=log_path, engine=engine)
+    monkeypatch.setattr(os, "getpid", lambda: 1)  # always running
+    live = FeedbackWriter(flush_interval=60, log_path=log_path, engine=engine)
+    crashed.submit(dict(ROW, age=41))
+    live.submit(dict(ROW, age=42))
+    live.flush()
+    assert _count(engine) == 1
+    assert (tmp_path / f"wb.log.{other.pid}").read_text().count("\n") == 1
+    live.close()
+    assert not (tmp_path / "wb.log.1").exists()
+
+    # the first worker dies without flushing; the next process to start claims its log
+    other.kill()
+    other.wait()
+    monkeypatch.setattr(os, "getpid", lambda: 2)
+    restarted = FeedbackWriter(flush_interval=60, log_path=log_path, engine=engine)
+    assert restarted.replayed == 1
+    restarted.close()
+    assert _count(engine) == 2
+    assert sorted(p.name for p in tmp_path.glob("wb.log*")) == []
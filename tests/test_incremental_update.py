@@ -0,0 +1,108 @@
+import contextlib
+import time
+
+import mlflow
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ml import train_model
+
+
+def _data(n=400, seed=44):
+    X, y = make_classification(n_samples=n, n_features=13, random_state=seed)
+    return pd.DataFrame(X, columns=train_model.FEATURES), pd.Series(y)
+
+
+def _forest(X, y, trees=40):
+    return Pipeline([("scale", StandardScaler()),
+                     ("clf", RandomForestClassifier(n_estimators=trees, random_state=44))]).fit(X, y)
+
+
+def test_forest_update_appends_trees():
+    X, y = _data()
+    model = _forest(X[:300], y[:300])
+    before = list(model.named_steps["clf"].estimators_)
+
+    updated = train_model.warm_start_update(model, X[300:], y[300:], base_rows=300)
+    trees = updated.named_steps["clf"].estimators_
+    # 100 new rows on a 300-row base: a third more trees, the old ones untouched
+    assert len(trees) == 40 + 13
+    assert all(a is b for a, b in zip(trees, before))
+
+
+def test_forest_update_is_capped(monkeypatch):
+    monkeypatch.setattr(train_model, "RF_MAX_TREES", 45)
+    X, y = _data()
+    model = _forest(X[:300], y[:300])
+    before = list(model.named_steps["clf"].estimators_)
+
+    trees = train_model.warm_start_update(model, X[300:], y[300:], base_rows=300).named_steps["clf"].estimators_
+    # the 13 new trees replace the oldest ones once the cap is reached
+    assert len(trees) == 45
+    assert all(a is b for a, b in zip(trees, before[8:]))
+
+
+def test_detect_drift():
+    X, y = _data()
+    model = _forest(X, y)
+    state = {"reference_accuracy": 1.0, "reference_mean": X.mean().tolist(), "reference_std": X.std().tolist()}
+    assert train_model.detect_drift(model, state, X[:100], y[:100]) is None
+    assert "accuracy" in train_model.detect_drift(model, state, X[:100], 1 - y[:100])
+    assert train_model.detect_drift(model, state, X[:10], 1 - y[:10]) is None  # too few rows to judge
+    # a shifted input distribution counts even when accuracy alone would pass
+    state["reference_accuracy"] = 0.0
+    assert "mean shifted" in train_model.detect_drift(model, state, X[:100] + 5, y[:100])
+
+
+def test_logistic_model_is_refit_alone(monkeypatch):
+    X, y = _data()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=44)
+    current = Pipeline([("scale", StandardScaler()),
+                        ("clf", LogisticRegression(max_iter=500))]).fit(X_train[:200], y_train[:200])
+    state = {
+        "feedback_high_water_mark": 10, "last_full_rebuild": time.time(), "model_name": "LogisticRegression",
+        "reference_accuracy": 0.0, "reference_mean": X.mean().tolist(), "reference_std": X.std().tolist(),
+        "reference_rows": 200,
+    }
+    written, published, loaded_up_to = {}, [], []
+
+    class Registry:
+        def __init__(self, **kwargs):
+            pass
+
+        def current(self):
+            return type("Loaded", (), {"model": current})
+
+    def load_and_prepare_data(feedback_max_id=None):
+        loaded_up_to.append(feedback_max_id)
+        return X_train, X_test, y_train, y_test, train_model.FEATURES
+
+    def full_rebuild(*args, **kwargs):
+        raise AssertionError("full rebuild for an LR model")
+
+    monkeypatch.setattr(train_model, "read_train_state", lambda: dict(state))
+    monkeypatch.setattr(train_model, "write_train_state", written.update)
+    monkeypatch.setattr(train_model, "load_feedback_since", lambda hwm: (X_test[:40], y_test[:40], 25))
+    monkeypatch.setattr(train_model, "ModelRegistry", Registry)
+    monkeypatch.setattr(train_model, "load_and_prepare_data", load_and_prepare_data)
+    monkeypatch.setattr(train_model, "full_rebuild", full_rebuild)
+    monkeypatch.setattr(train_model, "export_and_publish", lambda model, name, X: published.append(model) or "v2")
+    monkeypatch.setattr(mlflow, "start_run", lambda **kwargs: contextlib.nullcontext())
+    monkeypatch.setattr(mlflow, "log_metric", lambda *args: None)
+
+    train_model.incremental_update()
+
+    assert loaded_up_to == [25]
+    assert len(published) == 1 and published[0] is not current
+    assert written["feedback_high_water_mark"] == 25
+    assert written["model_version"] == "v2"
+    assert written["reference_rows"] == len(X_train)
+    assert written["reference_accuracy"] == pytest.approx(
+        np.mean(published[0].predict(X_test) == y_test))
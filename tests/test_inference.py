@@ -0,0 +1,94 @@
+import io
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from app.inference import compile_model, explain, load_compiled, load_compiled_dir, save_compiled, save_compiled_dir
+
+
+@pytest.fixture(scope="module")
+def data():
+    X, y = make_classification(n_samples=400, n_features=13, n_informative=6, random_state=44)
+    # put the features on heart.csv-like scales so the folded scaler matters
+    X = X * np.linspace(1, 60, 13) + np.linspace(0, 200, 13)
+    return X[:300], X[300:], y[:300], y[300:]
+
+
+def _assert_parity(estimator, X, atol, tmp_path):
+    compiled = compile_model(estimator)
+    buf = io.BytesIO()
+    save_compiled(compiled, buf)
+    buf.seek(0)
+    save_compiled_dir(compiled, str(tmp_path / "arrays"))
+    mapped = load_compiled_dir(str(tmp_path / "arrays"))
+    assert all(isinstance(a, np.memmap) for a in mapped.arrays.values())
+    for candidate in (compiled, load_compiled(buf), mapped):
+        np.testing.assert_array_equal(candidate.predict(X), estimator.predict(X))
+        np.testing.assert_allclose(candidate.predict_proba(X), estimator.predict_proba(X), rtol=0, atol=atol)
+        np.testing.assert_allclose(candidate.predict_proba(X[:1]), estimator.predict_proba(X[:1]), rtol=0, atol=atol)
+
+
+def test_logistic_regression_parity(data, tmp_path):
+    X_train, X_test, y_train, _ = data
+    pipe = Pipeline([("scale", StandardScaler()), ("clf", LogisticRegression(max_iter=500, class_weight="balanced"))])
+    pipe.fit(X_train, y_train)
+    _assert_parity(pipe, X_test, atol=1e-12, tmp_path=tmp_path)
+
+
+def test_random_forest_parity(data, tmp_path):
+    X_train, X_test, y_train, _ = data
+    pipe = Pipeline([("scale", StandardScaler()), ("clf", RandomForestClassifier(n_estimators=50, random_state=44))])
+    pipe.fit(X_train, y_train)
+    _assert_parity(pipe, X_test, atol=0, tmp_path=tmp_path)
+
+
+def test_xgboost_parity(data, tmp_path):
+    xgboost = pytest.importorskip("xgboost")
+    X_train, X_test, y_train, _ = data
+    model = xgboost.XGBClassifier(n_estimators=60, max_depth=4, learning_rate=0.1, random_state=44)
+    model.fit(X_train, y_train)
+    _assert_parity(model, X_test, atol=1e-6, tmp_path=tmp_path)
+
+
+def _assert_contributions_add_up(estimator, X, units, method):
+    contributions, base, got_units, got_method = explain(compile_model(estimator), X)
+    assert (got_units, got_method) == (units, method)
+    assert contributions.shape == X.shape and base.shape == (len(X),)
+    p = estimator.predict_proba(X)[:, 1]
+    expected = p if units == "probability" else np.log(p / (1 - p))
+    np.testing.assert_allclose(contributions.sum(axis=1) + base, expected, rtol=0, atol=1e-4)
+    return contributions, base
+
+
+def test_contributions_add_up_to_the_score(data):
+    X_train, X_test, y_train, _ = data
+    lr = Pipeline([("scale", StandardScaler()), ("clf", LogisticRegression(max_iter=500))]).fit(X_train, y_train)
+    contributions, _ = _assert_contributions_add_up(lr, X_test, "log-odds", "exact")
+    # coefficient times standardized input
+    scale, clf = lr.named_steps["scale"], lr.named_steps["clf"]
+    np.testing.assert_allclose(contributions, scale.transform(X_test) * clf.coef_[0], atol=1e-9)
+
+    rf = Pipeline([("scale", StandardScaler()),
+                   ("clf", RandomForestClassifier(n_estimators=30, random_state=44))]).fit(X_train, y_train)
+    _assert_contributions_add_up(rf, X_test, "probability", "approximate")
+    # a pickle is explained through its compiled form
+    np.testing.assert_allclose(explain(rf, X_test)[0], explain(compile_model(rf), X_test)[0])
+
+
+def test_xgboost_contributions_match_the_booster(data):
+    xgboost = pytest.importorskip("xgboost")
+    X_train, X_test, y_train, _ = data
+    model = xgboost.XGBClassifier(n_estimators=40, max_depth=4, random_state=44).fit(X_train, y_train)
+    contributions, base = _assert_contributions_add_up(model, X_test, "log-odds", "approximate")
+    approx = model.get_booster().predict(xgboost.DMatrix(X_test), pred_contribs=True, approx_contribs=True)
+    np.testing.assert_allclose(contributions, approx[:, :-1], atol=1e-5)
+    np.testing.assert_allclose(base, approx[:, -1], atol=1e-5)
+
+    exact, exact_base, units, method = explain(model, X_test)
+    assert (units, method) == ("log-odds", "exact")
+    np.testing.assert_allclose(exact.sum(axis=1) + exact_base, contributions.sum(axis=1) + base, atol=1e-4)
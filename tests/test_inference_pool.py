@@ -0,0 +1,99 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from app.inference import compile_model
+from app.inference_pool import InferencePool, InferencePoolBusyError, _resident_versions
+from app.model_registry import ModelRegistry, publish_model
+
+
+@pytest.fixture(scope="module")
+def published(tmp_path_factory):
+    X, y = make_classification(n_samples=300, n_features=13, random_state=0)
+    model = Pipeline([("scale", StandardScaler()), ("clf", LogisticRegression(max_iter=500))]).fit(X, y)
+    model_dir = str(tmp_path_factory.mktemp("models"))
+    publish_model(model, model_dir=model_dir, compiled=compile_model(model))
+    return model, model_dir, X
+
+
+@pytest.fixture(scope="module")
+def pool(published):
+    _, model_dir, _ = published
+    pool = InferencePool(workers=1, slots=2, max_rows=32, acquire_timeout=5.0, model_dir=model_dir)
+    yield pool
+    pool.close()
+
+
+def test_pool_matches_in_process_scoring(pool, published):
+    model, model_dir, X = published
+    loaded = pool.bind(ModelRegistry(model_dir=model_dir).current())
+    assert loaded.model.version == loaded.version
+
+    # 100 rows go through in four chunks of at most 32
+    np.testing.assert_allclose(loaded.model.predict_proba(X[:100]), model.predict_proba(X[:100]), atol=1e-9)
+    np.testing.assert_array_equal(loaded.model.predict(X[:5]), model.predict(X[:5]))
+    assert pool.stats()["rows"] >= 105
+    assert pool.stats()["free_slots"] == 2
+
+
+def test_pool_rejects_when_slots_are_busy(pool, published):
+    _, model_dir, X = published
+    loaded = pool.bind(ModelRegistry(model_dir=model_dir).current())
+    pool.acquire_timeout = 0.05
+    held = [pool._free.get(), pool._free.get()]
+    try:
+        with pytest.raises(InferencePoolBusyError):
+            loaded.model.predict_proba(X[:1])
+        assert pool.stats()["rejected"] == 1
+    finally:
+        for slot in held:
+            pool._free.put(slot)
+        pool.acquire_timeout = 5.0
+
+    # concurrent callers share the slots and all get answers
+    results = [None] * 8
+    def call(i):
+        results[i] = loaded.model.predict_proba(X[i:i + 1])
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(r is not None and r.shape == (1, 2) for r in results)
+
+
+def test_bound_version_survives_a_publish(pool, published, tmp_path):
+    model_a, _, X = published
+    model_dir = str(tmp_path)
+    publish_model(model_a, model_dir=model_dir, compiled=compile_model(model_a))
+    loaded_a = pool.bind(ModelRegistry(model_dir=model_dir).current())
+
+    # a new version lands after the request was bound, before it is scored
+    model_b = Pipeline([("scale", StandardScaler()), ("clf", LogisticRegression(max_iter=500))]).fit(X, X[:, 0] > 0)
+    version_b = publish_model(model_b, model_dir=model_dir, compiled=compile_model(model_b))
+    assert version_b != loaded_a.version
+
+    np.testing.assert_allclose(loaded_a.model.predict_proba(X[:20]), model_a.predict_proba(X[:20]), atol=1e-9)
+    loaded_b = pool.bind(ModelRegistry(model_dir=model_dir).current())
+    assert loaded_b.version == version_b
+    np.testing.assert_allclose(loaded_b.model.predict_proba(X[:20]), model_b.predict_proba(X[:20]), atol=1e-9)
+    # ...and requests still pinned to the old version keep getting its answers
+    np.testing.assert_allclose(loaded_a.model.predict_proba(X[:20]), model_a.predict_proba(X[:20]), atol=1e-9)
+
+
+def test_worker_keeps_one_copy_per_model_dir(published):
+    model, model_dir, X = published
+    # MODEL_DIR is usually relative; bound models carry absolute paths
+    pool = InferencePool(workers=1, slots=1, max_rows=32, acquire_timeout=5.0, model_dir=os.path.relpath(model_dir))
+    try:
+        loaded = pool.bind(ModelRegistry(model_dir=model_dir).current())
+        np.testing.assert_allclose(loaded.model.predict_proba(X[:5]), model.predict_proba(X[:5]), atol=1e-9)
+        assert pool._executor.submit(_resident_versions).result() == {os.path.abspath(model_dir): [loaded.version]}
+    finally:
+        pool.close()
@@ -0,0 +1,18 @@
+from app.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_histogram_exposition():
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram("demo_seconds", "Demo latency", ("route",), buckets=(0.1, 1.0)))
+    outcomes = registry.register(Counter("demo_total", "Demo outcomes", ("outcome",)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/predict")
+    outcomes.inc("ok", amount=2)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_seconds histogram" in lines
+    assert 'demo_seconds_bucket{route="/predict",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/predict",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/predict",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/predict"} 4' in lines
+    assert 'demo_total{outcome="ok"} 2.0' in lines
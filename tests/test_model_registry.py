@@ -0,0 +1,78 @@
+import os
+
+from app.model_registry import ModelRegistry, ModelNotFoundError, publish_model
+
+
+def test_missing_model(tmp_path):
+    registry = ModelRegistry(model_dir=str(tmp_path))
+    try:
+        registry.current()
+        assert False, "expected ModelNotFoundError"
+    except ModelNotFoundError:
+        pass
+
+
+def test_hot_reload(tmp_path):
+    v1 = publish_model({"name": "first"}, model_dir=str(tmp_path))
+    registry = ModelRegistry(model_dir=str(tmp_path), check_interval=0)
+    reloads = []
+    registry.on_reload(lambda loaded: reloads.append(loaded.version))
+
+    first = registry.current()
+    assert first.version == v1
+    assert first.model == {"name": "first"}
+
+    v2 = publish_model({"name": "second"}, model_dir=str(tmp_path))
+    second = registry.current()
+    assert second.version == v2
+    assert second.model == {"name": "second"}
+    # the snapshot an in-flight request holds is untouched by the swap
+    assert first.model == {"name": "first"}
+    assert reloads == [v1, v2]
+    assert os.path.exists(tmp_path / "model.pkl")
+
+
+def test_legacy_layout(tmp_path):
+    import joblib
+    joblib.dump({"name": "legacy"}, tmp_path / "model.pkl")
+    registry = ModelRegistry(model_dir=str(tmp_path))
+    assert registry.current().model == {"name": "legacy"}
+    assert registry.version.startswith("mtime-")
+
+
+def test_compiled_form_is_served(tmp_path):
+    import numpy as np
+    from sklearn.linear_model import LogisticRegression
+    from app.inference import compile_model
+
+    X = np.arange(26, dtype=float).reshape(2, 13)
+    model = LogisticRegression().fit(X, [0, 1])
+    publish_model(model, model_dir=str(tmp_path), compiled=compile_model(model))
+
+    loaded = ModelRegistry(model_dir=str(tmp_path)).current()
+    assert loaded.source == "compiled"
+    assert loaded.model.predict(X).tolist() == model.predict(X).tolist()
+    assert ModelRegistry(model_dir=str(tmp_path), prefer_compiled=False).current().source == "pickle"
+
+
+def test_compiled_arrays_are_memory_mapped_and_pruned(tmp_path):
+    import numpy as np
+    from sklearn.linear_model import LogisticRegression
+    from app.inference import compile_model
+
+    X = np.arange(26, dtype=float).reshape(2, 13)
+    versions = []
+    for c in (0.5, 1.0, 2.0, 4.0):
+        model = LogisticRegression(C=c).fit(X, [0, 1])
+        versions.append(publish_model(model, model_dir=str(tmp_path), compiled=compile_model(model)))
+
+    loaded = ModelRegistry(model_dir=str(tmp_path)).current()
+    assert loaded.path.endswith(f"model-{versions[-1]}.arrays")
+    assert isinstance(loaded.model.coef, np.memmap)
+    assert not loaded.model.coef.flags.writeable
+    # versions published within the same second order by hash, so only count what pruning kept
+    kept = {p.name for p in tmp_path.glob("*.arrays")}
+    assert len(kept) == 3 and f"model-{versions[-1]}.arrays" in kept
+
+    in_memory = ModelRegistry(model_dir=str(tmp_path), mmap=False).current()
+    assert not isinstance(in_memory.model.coef, np.memmap)
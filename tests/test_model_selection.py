@@ -0,0 +1,49 @@
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ml import train_model
+
+
+def test_compact_variants_are_tree_prefixes():
+    X, y = make_classification(n_samples=300, n_features=13, random_state=44)
+    forest = Pipeline([("scale", StandardScaler()),
+                       ("clf", RandomForestClassifier(n_estimators=120, random_state=44))]).fit(X, y)
+
+    variants = dict(train_model.compact_variants("RandomForest", forest))
+    assert list(variants) == ["RandomForest_100trees", "RandomForest_50trees"]
+    small = variants["RandomForest_50trees"]
+    assert len(small.named_steps["clf"].estimators_) == 50
+    # the original keeps all its trees
+    assert len(forest.named_steps["clf"].estimators_) == 120
+
+    expected = np.mean([t.predict_proba(forest.named_steps["scale"].transform(X[:5]))
+                        for t in forest.named_steps["clf"].estimators_[:50]], axis=0)
+    np.testing.assert_allclose(small.predict_proba(X[:5]), expected)
+
+    full_cost = train_model.serving_cost(forest, X, repeats=3)
+    small_cost = train_model.serving_cost(small, X, repeats=3)
+    assert small_cost["size_mb"] < full_cost["size_mb"]
+    assert set(small_cost) == {"size_mb", "single_ms", "batch_ms"}
+
+    assert list(train_model.compact_variants("LogisticRegression", LogisticRegression().fit(X, y))) == []
+
+
+def test_select_model_respects_budget_and_tolerance():
+    scores = {"big": {"auc": 0.92, "acc": 0.85}, "small": {"auc": 0.915, "acc": 0.84},
+              "tiny": {"auc": 0.88, "acc": 0.82}}
+    costs = {"big": {"size_mb": 8.0, "single_ms": 0.4, "batch_ms": 15.0},
+             "small": {"size_mb": 1.0, "single_ms": 0.25, "batch_ms": 1.5},
+             "tiny": {"size_mb": 0.01, "single_ms": 0.02, "batch_ms": 0.02}}
+    no_limit = {"size_mb": 0, "single_ms": 0, "batch_ms": 0}
+
+    assert train_model.select_model(scores, costs, no_limit) == "big"
+    assert train_model.select_model(scores, costs, no_limit, auc_tolerance=0.01) == "small"
+    assert train_model.select_model(scores, costs, dict(no_limit, size_mb=2)) == "small"
+    assert train_model.select_model(scores, costs, dict(no_limit, batch_ms=1)) == "tiny"
+    # nothing fits: fall back to the smallest
+    assert train_model.select_model(scores, costs, dict(no_limit, single_ms=0.001)) == "tiny"
+    assert train_model.budget_violations(costs["big"], dict(no_limit, size_mb=2, batch_ms=10)) == ["size_mb", "batch_ms"]
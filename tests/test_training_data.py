@@ -0,0 +1,26 @@
+import pandas as pd
+
+from ml import train_model
+
+
+def test_clean_frame_accepts_labels_and_codes():
+    raw = pd.DataFrame({
+        "id": [1, 2], "dataset": ["Cleveland", None],
+        "age": [63, 50], "sex": ["Male", 1], "cp": ["typical angina", 3],
+        "trestbps": [145, 120], "chol": [233, 200], "fbs": ["TRUE", 0],
+        "restecg": ["lv hypertrophy", 1], "thalch": [150, 160], "exang": ["FALSE", 1],
+        "oldpeak": [2.3, 0.5], "slope": ["downsloping", 1], "ca": [0, 2],
+        "thal": ["fixed defect", 2], "num": [0, 2],
+    })
+    cleaned = train_model.clean_frame(raw)
+    assert list(cleaned.columns) == train_model.PREPARED_COLUMNS
+    assert cleaned.iloc[0][["sex", "cp", "fbs", "restecg", "exang", "slope", "thal"]].tolist() == [0, 0, 1, 2, 0, 2, 1]
+    assert cleaned.iloc[1][["sex", "cp", "fbs", "restecg", "exang", "slope", "thal"]].tolist() == [1, 3, 0, 1, 1, 1, 2]
+
+
+def test_clean_csv_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(train_model, "PREP_CACHE_DIR", str(tmp_path / "cache"))
+    first = train_model.load_clean_csv()
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    second = train_model.load_clean_csv()
+    pd.testing.assert_frame_equal(first, second)